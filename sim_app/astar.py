@@ -9,9 +9,28 @@
 # - Added meters conversion via env.cell_to_meters
 # - Adjusted neighbor interface (get_neighbors returns (neighbor, cost))
 # - Simplified search loop for single-robot use case
+# - Binary-heap open set with lazy deletion (ties broken on lower h)
+# - GridAStar: array-backed engine over flat cell indices
+# - SpaceTimeAStar: (x, y, t) search against a reservation table (prioritized planning)
+
+import heapq
+import math
+from itertools import count
+
+import numpy as np
 
 from sim_app import shared
 
+
+def _report_path(env, path):
+    """Store the planned path (meters) in shared and print it."""
+    # Convert to meters using the environment’s grid/res
+    shared.latest_astar_path = [env.cell_to_meters(p) for p in path]
+    print("\n🚦 A* planned path:")
+    for i, p in enumerate(path):
+        print(f"  [{i}] Grid: {p} => Meters: {env.cell_to_meters(p)}")
+
+
 class AStar:
     def __init__(self, env):
         self.env = env
@@ -19,6 +38,7 @@ class AStar:
         self.admissible_heuristic = env.admissible_heuristic
         self.is_at_goal = env.is_at_goal
         self.get_neighbors = env.get_neighbors
+        self.expansions = 0  # nodes closed by the last search
 
     def reconstruct_path(self, came_from, current):
         total_path = [current]
@@ -29,33 +49,230 @@ class AStar:
 
     def search(self, agent_name):
         initial_state = self.agent_dict[agent_name]["start"]
+        self.expansions = 0
         closed_set = set()
-        open_set = {initial_state}
         came_from = {}
         g_score = {initial_state: 0.0}
-        f_score = {initial_state: self.admissible_heuristic(initial_state, agent_name)}
+        h0 = self.admissible_heuristic(initial_state, agent_name)
+
+        # Heap entries: (f, h, tie, node). Stale entries (a better g was found
+        # after the push, or the node is already closed) are skipped on pop.
+        tie = count()
+        open_heap = [(h0, h0, next(tie), initial_state)]
 
-        while open_set:
-            current = min(open_set, key=lambda n: f_score.setdefault(n, float("inf")))
+        while open_heap:
+            _f, _h, _, current = heapq.heappop(open_heap)
+            if current in closed_set:
+                continue
             if self.is_at_goal(current, agent_name):
                 path = self.reconstruct_path(came_from, current)
-                # Convert to meters using the environment’s grid/res
-                shared.latest_astar_path = [self.env.cell_to_meters(p) for p in path]
-                print("\n🚦 A* planned path:")
-                for i, p in enumerate(path):
-                    print(f"  [{i}] Grid: {p} => Meters: {self.env.cell_to_meters(p)}")
+                _report_path(self.env, path)
                 return path
 
-            open_set.remove(current)
             closed_set.add(current)
+            self.expansions += 1
+            g_current = g_score[current]
 
             for neighbor, move_cost in self.get_neighbors(current):
                 if neighbor in closed_set:
                     continue
-                tentative = g_score[current] + move_cost
-                if neighbor not in open_set or tentative < g_score.get(neighbor, float("inf")):
+                tentative = g_current + move_cost
+                if tentative < g_score.get(neighbor, float("inf")):
                     came_from[neighbor] = current
                     g_score[neighbor] = tentative
-                    f_score[neighbor] = tentative + self.admissible_heuristic(neighbor, agent_name)
-                    open_set.add(neighbor)
+                    h = self.admissible_heuristic(neighbor, agent_name)
+                    heapq.heappush(open_heap, (tentative + h, h, next(tie), neighbor))
+        return False
+
+
+class GridAStar:
+    """
+    Array-backed A* over flat cell indices.
+
+    Same interface as AStar (built from an AStarEnvironment, `search(agent_name)`
+    returns a list of (x, y) cells or False), but g/parent/closed live in
+    preallocated NumPy arrays indexed by idx = y*W + x of a grid padded with a
+    one-cell blocked border, so neighbor expansion is a fixed table of flat
+    offsets and step costs with no bounds checks and no per-node tuples.
+    The buffers are reset (not reallocated) when `search` is called again.
+
+    `allowed` (optional H x W bool mask) restricts the search to a region,
+    e.g. a corridor around a coarse path; costs are unchanged inside it.
+    `report=False` skips storing/printing the path (helper searches).
+    """
+
+    def __init__(self, env, allowed: np.ndarray | None = None, report: bool = True):
+        self.env = env
+        self.report = report
+        self.agent_dict = env.agent_dict
+        self.W = env.W + 2
+        self.H = env.H + 2
+        n = self.W * self.H
+
+        # shared per map (env.padded_tables); the region mask is per search
+        self.blocked, self.cell_cost = env.padded_tables()
+        self.allowed = None
+        if allowed is not None:
+            mask = np.zeros((self.H, self.W), dtype=bool)
+            mask[1:-1, 1:-1] = allowed
+            self.allowed = mask.ravel()
+
+        self.g = np.full(n, np.inf, dtype=np.float64)
+        self.parent = np.full(n, -1, dtype=np.int64)
+        self.closed = np.zeros(n, dtype=bool)
+        self.expansions = 0  # nodes closed by the last search
+
+        W = self.W
+        self.offsets = tuple(
+            (dy * W + dx, math.sqrt(2) if dx and dy else 1.0)
+            for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1),
+                           (-1, -1), (-1, 1), (1, -1), (1, 1))
+        )
+
+    def _index(self, cell) -> int:
+        return (cell[1] + 1) * self.W + (cell[0] + 1)
+
+    def _cell(self, idx: int) -> tuple[int, int]:
+        y, x = divmod(idx, self.W)
+        return x - 1, y - 1
+
+    def reconstruct_path(self, goal_idx: int) -> list[tuple[int, int]]:
+        parent = self.parent
+        path = []
+        idx = goal_idx
+        while idx >= 0:
+            path.append(self._cell(idx))
+            idx = int(parent[idx])
+        return path[::-1]
+
+    def search(self, agent_name):
+        start = self.agent_dict[agent_name]["start"]
+        goal = self.agent_dict[agent_name]["goal"]
+        W = self.W
+        g, parent, closed = self.g, self.parent, self.closed
+        g.fill(np.inf)
+        parent.fill(-1)
+        closed.fill(False)
+        self.expansions = 0
+
+        blocked, cell_cost, allowed = self.blocked, self.cell_cost, self.allowed
+        offsets = self.offsets
+        gx, gy = goal[0] + 1, goal[1] + 1
+        diag_extra = math.sqrt(2) - 1
+
+        def h_of(idx):
+            y, x = divmod(idx, W)
+            dx = abs(x - gx)
+            dy = abs(y - gy)
+            return dx + dy + diag_extra * min(dx, dy) - min(dx, dy)
+
+        start_idx = self._index(start)
+        goal_idx = self._index(goal)
+        g[start_idx] = 0.0
+        h0 = h_of(start_idx)
+        tie = count()
+        open_heap = [(h0, h0, next(tie), start_idx)]
+
+        while open_heap:
+            _f, _h, _, current = heapq.heappop(open_heap)
+            if closed[current]:
+                continue
+            if current == goal_idx:
+                path = self.reconstruct_path(current)
+                if self.report:
+                    _report_path(self.env, path)
+                return path
+
+            closed[current] = True
+            self.expansions += 1
+            g_current = g[current]
+
+            for off, step in offsets:
+                nb = current + off
+                if blocked[nb] or closed[nb] or (allowed is not None and not allowed[nb]):
+                    continue
+                tentative = g_current + step + cell_cost[nb]
+                if tentative < g[nb]:
+                    g[nb] = tentative
+                    parent[nb] = current
+                    h = h_of(nb)
+                    heapq.heappush(open_heap, (tentative + h, h, next(tie), nb))
+        return False
+
+
+class SpaceTimeAStar:
+    """
+    A* over (x, y, t) states that avoids cells reserved by other robots.
+
+    Moves are the env's 8-connected steps plus "wait in place"; every action
+    takes one time step. A state is rejected if the reservation table holds
+    its cell at that step. The goal is reached only once the goal cell stays
+    free for good. Past the table's horizon nothing is reserved, so t is
+    clamped there and the search degrades to plain spatial A*.
+
+    search() returns the cell path with waits as repeated cells, or False.
+    """
+
+    def __init__(self, env, reservations, wait_cost: float = 1.0, max_expansions: int = 200_000):
+        self.env = env
+        self.agent_dict = env.agent_dict
+        self.admissible_heuristic = env.admissible_heuristic
+        self.get_neighbors = env.get_neighbors
+        self.table = reservations
+        self.wait_cost = float(wait_cost)
+        self.max_expansions = int(max_expansions)
+        self.expansions = 0  # nodes closed by the last search
+
+    def search(self, agent_name):
+        start = self.agent_dict[agent_name]["start"]
+        goal = self.agent_dict[agent_name]["goal"]
+        table = self.table
+        horizon = table.horizon
+        goal_free_from = table.last_reserved(*goal) + 1
+        if goal_free_from == math.inf:
+            # another robot parks on the goal: no arrival time can be free
+            print(f"⚠️ Goal {tuple(goal)} is held by a parked robot; no space-time path.")
+            return False
+
+        s0 = (start[0], start[1], 0)
+        came_from = {}
+        g_score = {s0: 0.0}
+        closed = set()
+        h0 = self.admissible_heuristic(start, agent_name)
+        tie = count()
+        open_heap = [(h0, h0, next(tie), s0)]
+        self.expansions = 0
+
+        while open_heap:
+            _f, _h, _, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            x, y, t = current
+            if (x, y) == goal and t >= goal_free_from:
+                states = [current]
+                while states[-1] in came_from:
+                    states.append(came_from[states[-1]])
+                path = [(sx, sy) for sx, sy, _t in reversed(states)]
+                _report_path(self.env, path)
+                return path
+
+            closed.add(current)
+            self.expansions += 1
+            if self.expansions > self.max_expansions:
+                break
+
+            nt = min(t + 1, horizon)
+            moves = self.get_neighbors((x, y)) + [((x, y), self.wait_cost)]
+            for (nx, ny), move_cost in moves:
+                if table.is_reserved(nx, ny, t + 1):
+                    continue
+                nxt = (nx, ny, nt)
+                if nxt in closed:
+                    continue
+                tentative = g_score[current] + move_cost
+                if tentative < g_score.get(nxt, float("inf")):
+                    came_from[nxt] = current
+                    g_score[nxt] = tentative
+                    h = self.admissible_heuristic((nx, ny), agent_name)
+                    heapq.heappush(open_heap, (tentative + h, h, next(tie), nxt))
         return False
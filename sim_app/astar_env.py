@@ -5,9 +5,16 @@ A* planning environment and grid/world conversions.
 - meters_to_grid / grid_to_meters: convert between world meters and grid cells.
 - AStarEnvironment: wraps a cost/occupancy grid with neighbor expansion,
   soft costs, and an optional proximity penalty to keep paths away from walls.
+- chebyshev_clearance: whole-grid distance to the nearest blocked cell, cached
+  against the blocked-mask contents so repeated plans on one map reuse it.
+- AStarEnvironment.padded_tables: the flat padded blocked / cost lists the
+  array engines index, cached against the grid contents and settings.
 """
 
+import hashlib
 import math
+from collections import OrderedDict
+
 import numpy as np
 from sim_app.shared import MAP_RESOLUTION as DEFAULT_RES
 
@@ -30,10 +37,79 @@ def grid_to_meters(cx: int, cy: int, grid: np.ndarray, res: float) -> tuple[floa
     return x, y
 
 
+# ============================================================================
+# Clearance field (cached)
+# ============================================================================
+
+_CLEARANCE_CACHE: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_CLEARANCE_CACHE_MAX = 8
+
+# Padded flat tables (Python lists) per (grid contents, settings); a 1000 x 1000
+# map's tables take ~40 MB, so only a few are kept
+_TABLE_CACHE: "OrderedDict[tuple, tuple[list, list]]" = OrderedDict()
+_TABLE_CACHE_MAX = 2
+
+
+def _dilate3x3(mask: np.ndarray) -> np.ndarray:
+    """One step of 3x3 (Chebyshev radius 1) binary dilation, clipped at the borders."""
+    out = mask.copy()
+    out[1:, :] |= mask[:-1, :]
+    out[:-1, :] |= mask[1:, :]
+    rows = out.copy()
+    out[:, 1:] |= rows[:, :-1]
+    out[:, :-1] |= rows[:, 1:]
+    return out
+
+
+def _compute_clearance(blocked: np.ndarray, k: int) -> np.ndarray:
+    """
+    Chebyshev distance from every cell to the nearest blocked cell, capped at k+1.
+
+    Blocked cells get 0. Cells with no blocked cell within k rings get k+1.
+    Built from k vectorized 3x3 dilations (O(k*H*W) array work, no Python per cell).
+    """
+    clearance = np.full(blocked.shape, k + 1, dtype=np.int16)
+    reach = blocked.astype(bool, copy=True)
+    clearance[reach] = 0
+    for d in range(1, k + 1):
+        grown = _dilate3x3(reach)
+        clearance[grown & ~reach] = d
+        reach = grown
+    return clearance
+
+
+def chebyshev_clearance(blocked: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the (read-only) clearance field for `blocked`, capped at k+1.
+
+    Results are cached on (shape, k, digest of the mask bytes), so repeated plans
+    on an unchanged map skip the rebuild and only pay for hashing the mask.
+    """
+    mask = np.ascontiguousarray(blocked, dtype=np.uint8)
+    key = (mask.shape, int(k), hashlib.blake2b(mask.tobytes(), digest_size=16).digest())
+    cached = _CLEARANCE_CACHE.get(key)
+    if cached is not None:
+        _CLEARANCE_CACHE.move_to_end(key)
+        return cached
+
+    clearance = _compute_clearance(mask, int(k))
+    clearance.setflags(write=False)
+    _CLEARANCE_CACHE[key] = clearance
+    while len(_CLEARANCE_CACHE) > _CLEARANCE_CACHE_MAX:
+        _CLEARANCE_CACHE.popitem(last=False)
+    return clearance
+
+
 # ============================================================================
 # A* Environment
 # ============================================================================
 
+_DIRS = (
+    (-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+    (-1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (1, 1, math.sqrt(2)),
+)
+
+
 class AStarEnvironment:
     """
     A* search environment over a 2D grid.
@@ -51,8 +127,9 @@ class AStarEnvironment:
 
     Notes:
         - Proximity penalty keeps solutions away from walls/obstacles even if
-          the base grid is binary. It scans up to `proximity_k_cells` rings
-          around each neighbor to find the nearest blocked cell.
+          the base grid is binary. The Chebyshev clearance of every cell (up to
+          `proximity_k_cells` rings) is computed once per map and cached, and
+          the per-cell extra step cost is precomputed into `cell_cost`.
     """
 
     def __init__(
@@ -82,6 +159,28 @@ class AStarEnvironment:
         self.proximity_k = int(proximity_k_cells) if proximity_k_cells else 0
         self.proximity_cost_gain = float(proximity_cost_gain)
 
+        # Clearance field (shared across environments built on the same map)
+        self.clearance = (
+            chebyshev_clearance(self._blocked, self.proximity_k)
+            if self.proximity_k > 0 else None
+        )
+
+        # Extra cost for stepping INTO each cell (soft cost + proximity penalty)
+        self.cell_cost = self._build_cell_cost()
+
+    def _build_cell_cost(self) -> np.ndarray:
+        """Precompute the additive per-cell step cost used by get_neighbors."""
+        cost = np.zeros((self.H, self.W), dtype=np.float64)
+        if self.soft_cost_gain is not None:
+            cost += self.soft_cost_gain * self.grid
+        if self.clearance is not None and self.proximity_cost_gain > 0.0:
+            # closer => larger penalty; farther => smaller
+            # e.g., with k=3: d=1 → 3, d=2 → 2, d=3 → 1
+            ring_weight = np.clip(self.proximity_k + 1 - self.clearance, 0, None)
+            ring_weight[self.clearance == 0] = 0  # blocked cells are never entered
+            cost += self.proximity_cost_gain * ring_weight
+        return cost
+
     # ------------------------------------------------------------------ #
     # A* Interface
     # ------------------------------------------------------------------ #
@@ -97,65 +196,64 @@ class AStarEnvironment:
         dy = abs(pos[1] - goal[1])
         return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
 
-    # --- Chebyshev ring scan to nearest blocked cell up to k rings ---
     def _chebyshev_dist_to_blocked(self, x: int, y: int) -> int | None:
         """
         Return d in [1..k] if a blocked cell exists within Chebyshev distance d; else None.
-        Scans ring borders only for speed.
+        Reads the cached clearance field.
         """
-        if self.proximity_k <= 0:
+        if self.clearance is None:
             return None
-        H, W = self.H, self.W
-        for d in range(1, self.proximity_k + 1):
-            x0, x1 = max(0, x - d), min(W, x + d + 1)
-            y0, y1 = max(0, y - d), min(H, y + d + 1)
-            # top & bottom rows
-            if self._blocked[y0, x0:x1].any() or self._blocked[y1 - 1, x0:x1].any():
-                return d
-            # left & right cols (excluding corners already checked)
-            if self._blocked[y0 + 1:y1 - 1, x0].any() or self._blocked[y0 + 1:y1 - 1, x1 - 1].any():
-                return d
-        return None
+        d = int(self.clearance[y, x])
+        return d if 1 <= d <= self.proximity_k else None
 
     def get_neighbors(self, pos):
         """
         8-connected neighbors with step cost:
           - 1.0 for cardinal moves, sqrt(2) for diagonals
-          - optional soft cost from grid values
-          - optional proximity penalty near blocked cells
+          - plus the precomputed `cell_cost` of the neighbor
+            (optional soft cost and proximity penalty near blocked cells)
         Skips neighbors with grid >= block_threshold.
         """
-        dirs = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                (-1, -1), (-1, 1), (1, -1), (1, 1)]
         out = []
-        for dx, dy in dirs:
+        for dx, dy, step in _DIRS:
             nx, ny = pos[0] + dx, pos[1] + dy
             if 0 <= nx < self.W and 0 <= ny < self.H:
-                g = self.grid[ny, nx]
-
                 # Hard block if cost >= threshold
-                if g >= self.block_threshold:
+                if self._blocked[ny, nx]:
                     continue
-
-                # Base step cost (diagonal vs straight)
-                step = math.sqrt(2) if dx and dy else 1.0
-
-                # Existing soft cost (if your grid has fractional costs)
-                if self.soft_cost_gain is not None:
-                    step += self.soft_cost_gain * float(g)
-
-                # Proximity penalty if near blocked cells (even on binary grids)
-                if self.proximity_k > 0 and self.proximity_cost_gain > 0.0:
-                    d = self._chebyshev_dist_to_blocked(nx, ny)
-                    if d is not None:
-                        # closer => larger penalty; farther => smaller
-                        # e.g., with k=3: d=1 → 3, d=2 → 2, d=3 → 1
-                        ring_weight = (self.proximity_k - d + 1)
-                        step += self.proximity_cost_gain * ring_weight
-
-                out.append(((nx, ny), step))
+                out.append(((nx, ny), step + float(self.cell_cost[ny, nx])))
         return out
 
+    def padded_tables(self) -> tuple[list, list]:
+        """
+        (blocked, cell_cost) as flat lists over the grid padded with a
+        one-cell blocked border (index (y + 1) * (W + 2) + (x + 1)). Lists
+        index much faster than arrays in a Python search loop; converting
+        costs O(H * W), so the result is shared by every environment built
+        on the same grid contents and settings. Treat it as read-only.
+        """
+        tables = getattr(self, "_padded_tables", None)
+        if tables is not None:
+            return tables
+        key = (
+            self.grid.shape, self.block_threshold, self.soft_cost_gain,
+            self.proximity_k, self.proximity_cost_gain,
+            hashlib.blake2b(np.ascontiguousarray(self.grid).tobytes(), digest_size=16).digest(),
+        )
+        tables = _TABLE_CACHE.get(key)
+        if tables is None:
+            blocked = np.ones((self.H + 2, self.W + 2), dtype=bool)
+            blocked[1:-1, 1:-1] = self._blocked.astype(bool)
+            cost = np.zeros((self.H + 2, self.W + 2), dtype=np.float64)
+            cost[1:-1, 1:-1] = self.cell_cost
+            tables = _TABLE_CACHE[key] = (blocked.ravel().tolist(), cost.ravel().tolist())
+            while len(_TABLE_CACHE) > _TABLE_CACHE_MAX:
+                _TABLE_CACHE.popitem(last=False)
+        else:
+            _TABLE_CACHE.move_to_end(key)
+        self._padded_tables = tables
+        return tables
+
     # ------------------------------------------------------------------ #
     # Convenience
     # ------------------------------------------------------------------ #
@@ -0,0 +1,315 @@
+# sim_app/bench_planner.py
+"""
+Planner benchmark.
+
+Runs start/goal queries through AStarEnvironment + each planner engine and
+reports wall-time percentiles, expansions/s, mean path cost and peak Python
+memory, as JSON so engine variants can be compared across commits.
+
+Maps:
+- the saved maps (sim_app/Final_Map.npz, sim_app/map_memory.npz if present),
+  queried with every LOCATION_MAP pair plus random free pairs;
+- synthetic warehouses (rack rows, aisles, cross-aisles) at the requested
+  sizes, queried with random free pairs.
+
+Usage:
+    python -m sim_app.bench_planner --sizes 225,500,1000 --pairs 20 --out bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+from sim_app import shared
+from sim_app.astar import AStar, GridAStar
+from sim_app.astar_env import AStarEnvironment, meters_to_grid
+from sim_app.goal_fields import cost_to_go, descend
+from sim_app.hpa import HPAGraph
+from sim_app.map_builder import _inflate, build_pyramid
+from sim_app.pyramid_planner import plan_coarse_to_fine
+
+
+SAVED_MAPS = [
+    os.path.join(os.path.dirname(__file__), "Final_Map.npz"),
+    shared.MAP_FILE,
+]
+
+
+# ============================================================================
+# Maps
+# ============================================================================
+
+def synthetic_warehouse(size: int, seed: int = 0) -> np.ndarray:
+    """
+    Binary occupancy (uint8) of a size x size warehouse: outer walls, rows of
+    racks 2 cells deep separated by aisles, and cross-aisles every ~40 cells.
+    """
+    rng = np.random.default_rng(seed)
+    occ = np.zeros((size, size), dtype=np.uint8)
+    occ[0, :] = occ[-1, :] = occ[:, 0] = occ[:, -1] = 1
+
+    margin = max(4, size // 20)
+    aisle = 6
+    for y in range(margin, size - margin, aisle + 2):
+        occ[y:y + 2, margin:size - margin] = 1
+    for x in range(margin + 20, size - margin, 40):
+        occ[:, x:x + aisle] = np.where(occ[:, x:x + aisle] == 1, 0, occ[:, x:x + aisle])
+        occ[0, x:x + aisle] = occ[-1, x:x + aisle] = 1
+
+    # a few scattered pallets
+    n = size * size // 2000
+    ys = rng.integers(1, size - 1, n)
+    xs = rng.integers(1, size - 1, n)
+    occ[ys, xs] = 1
+    return occ
+
+
+def planning_grid(occ: np.ndarray) -> np.ndarray:
+    """Inflate occupancy the same way the planner does."""
+    return _inflate(occ.astype(np.uint8), shared.INFLATION_RADIUS_M, shared.MAP_RESOLUTION).astype(np.float32)
+
+
+def _random_pairs(grid: np.ndarray, n: int, rng) -> list:
+    free = np.argwhere(grid < shared.PLANNER_SETTINGS["block_threshold"])
+    pairs = []
+    for _ in range(n):
+        a, b = free[rng.integers(len(free), size=2)]
+        pairs.append(((int(a[1]), int(a[0])), (int(b[1]), int(b[0]))))
+    return pairs
+
+
+def _location_pairs(grid: np.ndarray) -> list:
+    res = shared.MAP_RESOLUTION
+    H, W = grid.shape
+    cells = []
+    for x, y in shared.LOCATION_MAP.values():
+        gx, gy = meters_to_grid(x, y, grid, res)
+        if 0 <= gx < W and 0 <= gy < H:
+            cells.append((gx, gy))
+    return [(a, b) for a in cells for b in cells if a != b]
+
+
+# ============================================================================
+# Engines
+# ============================================================================
+
+def _env(grid, start, goal):
+    return AStarEnvironment(grid, start, goal, shared.MAP_RESOLUTION, **shared.PLANNER_SETTINGS)
+
+
+def _path_cost(env, path) -> float:
+    cost = 0.0
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        step = math.sqrt(2) if (x0 != x1 and y0 != y1) else 1.0
+        cost += step + float(env.cell_cost[y1, x1])
+    return cost
+
+
+class _MapCache:
+    """What an engine builds once per map and reuses across queries, plus build timings."""
+
+    def __init__(self):
+        self.fields: dict = {}       # goal -> cost-to-go field
+        self.pyramid = None
+        self.hpa = None
+        self.build_s: list[float] = []   # one-off builds (fields, HPA graph)
+        self.pending_build_s = 0.0       # build time spent inside the current query
+
+    def timed_build(self, build):
+        t0 = time.perf_counter()
+        value = build()
+        dt = time.perf_counter() - t0
+        self.build_s.append(dt)
+        self.pending_build_s += dt
+        return value
+
+
+def _run_search(engine_cls):
+    def run(grid, start, goal, _cache):
+        env = _env(grid, start, goal)
+        planner = engine_cls(env)
+        with contextlib.redirect_stdout(io.StringIO()):
+            path = planner.search("robot")
+        return env, path, planner.expansions
+    return run
+
+
+def _run_field(grid, start, goal, cache):
+    """Descent on a per-goal cost-to-go field (field build time is reported separately)."""
+    env = _env(grid, start, goal)
+    if goal not in cache.fields:
+        cache.fields[goal] = cache.timed_build(lambda: cost_to_go(env, goal))
+    return env, descend(env, cache.fields[goal], start), None
+
+
+def _run_coarse_to_fine(grid, start, goal, cache):
+    """Coarse-to-fine on the pyramid (built once per map, like MapView.pyramid)."""
+    env = _env(grid, start, goal)
+    if cache.pyramid is None:
+        cache.pyramid = build_pyramid(grid)
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = plan_coarse_to_fine(env, cache.pyramid, (4, 2))
+        if not path:
+            path = GridAStar(env).search("robot")
+    return env, path, None
+
+
+def _run_hpa(grid, start, goal, cache):
+    """HPA* on a sector graph built once per map (build time reported separately)."""
+    env = _env(grid, start, goal)
+    if cache.hpa is None:
+        cache.hpa = cache.timed_build(lambda: HPAGraph(env))
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = cache.hpa.search(env)
+    return env, path, cache.hpa.expansions
+
+
+ENGINES = {
+    "dict": _run_search(AStar),
+    "array": _run_search(GridAStar),
+    "field": _run_field,
+    "c2f": _run_coarse_to_fine,
+    "hpa": _run_hpa,
+}
+
+
+# ============================================================================
+# Benchmark
+# ============================================================================
+
+def _percentiles(values) -> dict:
+    if not values:
+        return {}
+    arr = np.asarray(values) * 1000.0
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p90": float(np.percentile(arr, 90)),
+        "p99": float(np.percentile(arr, 99)),
+        "mean": float(arr.mean()),
+        "max": float(arr.max()),
+    }
+
+
+def bench_engine(name: str, grid: np.ndarray, pairs: list, measure_memory: bool = True) -> dict:
+    """Run every pair through one engine; return aggregated metrics."""
+    run = ENGINES[name]
+    cache = _MapCache()
+    times, costs, expansions = [], [], []
+    failures = 0
+    for start, goal in pairs:
+        t0 = time.perf_counter()
+        env, path, n_exp = run(grid, start, goal, cache)
+        # query time only: a field / graph build is reported under field_build_ms
+        times.append(time.perf_counter() - t0 - cache.pending_build_s)
+        cache.pending_build_s = 0.0
+        if not path:
+            failures += 1
+            continue
+        costs.append(_path_cost(env, path))
+        if n_exp is not None:
+            expansions.append(n_exp)
+
+    peak_kb = None
+    if measure_memory and pairs:
+        # separate pass: tracemalloc slows allocation-heavy code a lot
+        tracemalloc.start()
+        run(grid, pairs[0][0], pairs[0][1], _MapCache())
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+
+    total_s = sum(times)
+    out = {
+        "engine": name,
+        "queries": len(pairs),
+        "failures": failures,
+        "wall_ms": _percentiles(times),
+        "expansions_per_s": (sum(expansions) / total_s) if expansions and total_s > 0 else None,
+        "mean_expansions": float(np.mean(expansions)) if expansions else None,
+        "mean_path_cost": float(np.mean(costs)) if costs else None,
+        "peak_mem_kb": peak_kb,
+    }
+    if cache.build_s:
+        out["field_build_ms"] = _percentiles(cache.build_s)
+    return out
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(sizes, n_pairs: int, engines, seed: int = 0, measure_memory: bool = True) -> dict:
+    """Benchmark saved maps and synthetic warehouses; returns the JSON-ready report."""
+    rng = np.random.default_rng(seed)
+    maps = []
+    for path in SAVED_MAPS:
+        if os.path.exists(path):
+            occ = np.load(path)["occupancy"]
+            grid = planning_grid(occ)
+            pairs = _location_pairs(grid) + _random_pairs(grid, n_pairs, rng)
+            maps.append((os.path.basename(path), grid, pairs))
+    for size in sizes:
+        grid = planning_grid(synthetic_warehouse(size, seed))
+        maps.append((f"warehouse_{size}", grid, _random_pairs(grid, n_pairs, rng)))
+
+    results = []
+    for map_name, grid, pairs in maps:
+        for name in engines:
+            r = bench_engine(name, grid, pairs, measure_memory=measure_memory)
+            r.update({"map": map_name, "shape": list(grid.shape)})
+            results.append(r)
+            p50 = r["wall_ms"].get("p50", float("nan"))
+            print(f"  {map_name:<20} {name:<6} p50 {p50:8.2f} ms  fails {r['failures']}")
+
+    return {
+        "meta": {
+            "git": _git_rev(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "seed": seed,
+            "settings": shared.PLANNER_SETTINGS,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the A* planner engines.")
+    ap.add_argument("--sizes", default="225,500", help="synthetic map sizes, e.g. 225,500,1000,2000")
+    ap.add_argument("--pairs", type=int, default=20, help="random start/goal pairs per map")
+    ap.add_argument("--engines", default=",".join(ENGINES), help="comma list of " + ", ".join(ENGINES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--out", default=None, help="write the JSON report here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    report = run_benchmark(sizes, args.pairs, engines, seed=args.seed, measure_memory=not args.no_memory)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+        print(f"💾 Benchmark written to: {args.out}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
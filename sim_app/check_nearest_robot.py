@@ -2,9 +2,14 @@
 """
 Planning + execution utilities:
 - Build a planning grid (without footprint clearing).
-- Plan A* path for a given robot.
-- Choose the nearest idle robot to a goal.
-- Execute a planned path (excute) with replanning and abort handling.
+- Plan A* path for a given robot (or descend a cached goal field for
+  LOCATION_MAP goals; large maps plan on the HPA* sector graph or
+  coarse-to-fine on the costmap pyramid).
+- Choose the idle robot with the cheapest real route to a goal (one reverse
+  search rooted at the goal), returning its path with the assignment.
+- Route around the reserved space-time paths of other busy robots.
+- Execute a planned path (excute) with replanning and abort handling;
+  replans reuse a per-robot incremental (D* Lite) planner.
 
 Notes:
 - Keeps original constants, prints, and function names (including 'excute').
@@ -12,15 +17,23 @@ Notes:
 
 import asyncio
 import math
+import threading
 import numpy as np
 from time import time  # kept even if unused
 
 import sim_app.robot_motion as OmniRobotMotion
 from sim_app import shared
-from sim_app.astar import AStar
+from sim_app.astar import AStar, GridAStar, SpaceTimeAStar
 from sim_app.astar_env import AStarEnvironment, grid_to_meters, meters_to_grid
-from sim_app.map_builder import get_planning_costmap
+from sim_app.dstar_lite import DStarLite
+from sim_app.goal_fields import GoalFieldCache, cost_to_go, descend
+from sim_app.hpa import HPAGraph
+from sim_app.map_builder import build_pyramid, planning_snapshot
 from sim_app.path_executor import PathExecutor
+from sim_app.path_smoothing import smooth_path
+from sim_app.pyramid_planner import plan_coarse_to_fine
+from sim_app.planning_service import PlanningService
+from sim_app.reservation import build_reservations, densify
 from sim_app.path_viz import plot_paths_once
 from sim_app.robot_controller import OmniRobotController
 
@@ -31,32 +44,140 @@ ID_TO_MODEL = {"Rob0": "Omnirob0", "Rob1": "Omnirob1", "Rob2": "Omnirob2"}
 # Tiny launch/arrival carve (cells)
 CLEAR_START_GOAL_RADIUS = 1
 
+# A* engine used by plan_path: "array" (GridAStar) or "dict" (AStar)
+PLANNER_ENGINE = "array"
+ENGINES = {"array": GridAStar, "dict": AStar}
+
+# Cost-to-go fields for the fixed LOCATION_MAP goals (persisted next to the map)
+USE_GOAL_FIELDS = True
+GOAL_FIELDS = GoalFieldCache()
+
+# Run A* searches in a process pool (grids shared via shared_memory)
+USE_PROCESS_POOL = True
+_PLANNING_SERVICE: PlanningService | None = None
+
+# Environment settings shared by in-process and pool planning
+PLANNER_SETTINGS = shared.PLANNER_SETTINGS
+
+# Hierarchical planning for maps at least this big (cells); smaller maps are
+# searched directly at full resolution
+COARSE_TO_FINE_MIN_CELLS = 250_000
+COARSE_TO_FINE_FACTORS = (4, 2)   # 0.8 m then 0.4 m levels
+# "hpa": abstract sector graph (sim_app/hpa.py), "pyramid": max-pooled costmap levels
+LARGE_MAP_PLANNER = "hpa"
+HPA_SECTOR_CELLS = 16             # 3.2 m sectors
+
+# HPA* graph of the current map, updated in place (changed sectors only)
+_HPA_GRAPH: HPAGraph | None = None
+_HPA_LOCK = threading.Lock()
+
+# Plan in space-time around the paths other busy robots have reserved
+USE_RESERVATIONS = True
+
+# Collapse cell paths into long straight/diagonal legs (fewer waypoints → fewer RPC cycles)
+SMOOTH_PATHS = True
+
+# Per-robot incremental planners, kept across the replans of one mission
+_REPLANNERS: dict[str, DStarLite] = {}
+
+# Background builds of those planners while a mission's first leg is driven
+_REPLANNER_WARMUPS: dict[str, asyncio.Task] = {}
+
 
 # -----------------------------------------------------------------------------
 # Planning grid
 # -----------------------------------------------------------------------------
 
-def _current_planning_grid() -> np.ndarray:
+def _pyramid_for(grid) -> dict:
+    """Pyramid of `grid`: the snapshot's cached one when grid is its costmap."""
+    view = planning_snapshot(shared.INFLATION_RADIUS_M)
+    return view.pyramid() if view.costmap is grid else build_pyramid(grid)
+
+
+def _hpa_plan(env):
+    """HPA* search on the shared sector graph, brought up to date with env's grid first."""
+    global _HPA_GRAPH
+    with _HPA_LOCK:
+        if _HPA_GRAPH is None or not _HPA_GRAPH.compatible(env):
+            _HPA_GRAPH = HPAGraph(env, HPA_SECTOR_CELLS)
+        elif _HPA_GRAPH.env.grid is not env.grid:
+            # new snapshot: only sectors with changed cells are recomputed
+            n = _HPA_GRAPH.update_map(env)
+            if n:
+                print(f"🔍 HPA*: map changed, {n} sectors recomputed.")
+        return _HPA_GRAPH.search(env)
+
+
+def _planning_env(grid, start_grid, goal_grid, res=None) -> AStarEnvironment:
+    """A* environment with the planner's blocking/proximity settings."""
+    return AStarEnvironment(
+        grid,
+        start_grid,
+        goal_grid,
+        res if res is not None else shared.MAP_RESOLUTION,
+        **PLANNER_SETTINGS,
+    )
+
+
+def planning_service() -> PlanningService:
+    """The shared process-pool planner (started on first use)."""
+    global _PLANNING_SERVICE
+    if _PLANNING_SERVICE is None:
+        _PLANNING_SERVICE = PlanningService(max_workers=len(ROBOT_IDS))
+    return _PLANNING_SERVICE
+
+
+def shutdown_planning_service() -> None:
+    """Stop pool workers and free shared grids (call on exit)."""
+    global _PLANNING_SERVICE
+    if _PLANNING_SERVICE is not None:
+        _PLANNING_SERVICE.shutdown()
+        _PLANNING_SERVICE = None
+
+
+def _replace_broken_planning_service(service: PlanningService) -> None:
+    """Drop a pool whose workers died; the next plan starts a fresh one. Never blocks."""
+    global _PLANNING_SERVICE
+    if _PLANNING_SERVICE is service:
+        _PLANNING_SERVICE = None
+        service.shutdown(wait=False)
+
+
+def _location_goal_cells(grid, res) -> set[tuple[int, int]]:
+    """Grid cells of all LOCATION_MAP labels that fall inside `grid`."""
+    H, W = grid.shape
+    cells = set()
+    for x, y in shared.LOCATION_MAP.values():
+        gx, gy = meters_to_grid(x, y, grid, res)
+        if 0 <= gx < W and 0 <= gy < H:
+            cells.add((gx, gy))
+    return cells
+
+
+def prepare_goal_fields() -> None:
     """
-    Build a planning view (no footprint clearing).
+    Load (or build and persist) the cost-to-go field of every LOCATION_MAP label
+    for the current planning map. Blocking; run it in a thread.
     """
-    if shared.global_occupancy is None or shared.global_occupancy.size == 0:
-        return np.zeros((shared.GRID_SIZE, shared.GRID_SIZE), dtype=np.float32)
-
-    grid = get_planning_costmap(
-        inflation_radius_m=shared.INFLATION_RADIUS_M
-    ).astype(np.float32)
-    return grid
+    with planning_snapshot(shared.INFLATION_RADIUS_M) as view:
+        grid = view.costmap
+        if grid.size == 0:
+            return
+        res = shared.MAP_RESOLUTION
+        env = _planning_env(grid, (0, 0), (0, 0), res)
+        GOAL_FIELDS.warm(env, _location_goal_cells(grid, res))
 
 
 # -----------------------------------------------------------------------------
 # Planner
 # -----------------------------------------------------------------------------
 
-async def plan_path(start_pos, goal_pos, robot_name):
+def _plan_setup(start_pos, goal_pos):
     """
-    Plan an A* path in meters between start_pos and goal_pos for robot_name.
-    Returns (path_in_meters, planning_grid) or (None, None) if planning fails.
+    Common planning prelude: grow the live map if needed, take the planning
+    view and convert start/goal to cells.
+    Returns (view, res, start_grid, goal_grid) or None if planning is impossible;
+    the planning grid is view.costmap.
     """
     if not shared.FREEZE_MAP:
         shared.ensure_map_covers(
@@ -65,10 +186,11 @@ async def plan_path(start_pos, goal_pos, robot_name):
             margin_m=1.0,
         )
 
-    grid = _current_planning_grid()
+    view = planning_snapshot(shared.INFLATION_RADIUS_M)
+    grid = view.costmap
     if grid.size == 0:
         print("⛔ Planning grid is empty. Did you load the saved map?")
-        return None, None
+        return None
 
     res = shared.MAP_RESOLUTION
     start_grid = meters_to_grid(start_pos[0], start_pos[1], grid, res)
@@ -78,38 +200,300 @@ async def plan_path(start_pos, goal_pos, robot_name):
     for (gx, gy), tag in ((start_grid, "start"), (goal_grid, "goal")):
         if not (0 <= gx < W and 0 <= gy < H):
             print(f"⛔ {tag} grid {gx,gy} lies outside the loaded map {W}x{H}.")
-            return None, None
+            return None
+    return view, res, start_grid, goal_grid
 
-    env = AStarEnvironment(
-        grid,
-        start_grid,
-        goal_grid,
-        res,
-        block_threshold=0.99,        # keep binary blocking strict
-        soft_cost_gain=None,         # using proximity cost instead
-        proximity_k_cells=3,         # rings to look around each neighbor (3 * 0.20 = 0.60 m)
-        proximity_cost_gain=0.5,     # tune 0.5–2.0; higher = keeps farther from walls
-    )
 
-    path_g = await asyncio.to_thread(AStar(env).search, "robot")
+def _plan_result(path_g, env, res, robot_name, smooth=True):
+    """Smooth a cell path, convert it to meters and publish it; (None, None) if empty."""
     if not path_g:
         print("❌ No path found during planning!")
         return None, None
 
+    grid = env.grid
+    if smooth and SMOOTH_PATHS:
+        path_g = smooth_path(path_g, env)
     path_m = [grid_to_meters(x, y, grid, res) for (x, y) in path_g]
     print(f"🚦 A* planned path with {len(path_m)} waypoints.")
     shared.latest_astar_path_by_robot[robot_name] = list(path_m)
+    # clean copy (the executor appends visited waypoints to latest_astar_path_by_robot)
+    shared.planned_path_by_robot[robot_name] = list(path_m)
     return path_m, grid
 
 
+async def plan_path(start_pos, goal_pos, robot_name):
+    """
+    Plan an A* path in meters between start_pos and goal_pos for robot_name.
+    Returns (path_in_meters, planning_grid) or (None, None) if planning fails.
+    """
+    setup = _plan_setup(start_pos, goal_pos)
+    if setup is None:
+        return None, None
+    view, res, start_grid, goal_grid = setup
+
+    # the reference keeps this map version's view registered while the
+    # searches below run off-thread
+    with view:
+        grid = view.costmap
+        env = _planning_env(grid, start_grid, goal_grid, res)
+        path_g = await _plan_cells(env, grid, res, start_grid, goal_grid, robot_name)
+        path_g, smooth = await _avoid_reservations(path_g, env, res, robot_name)
+        return _plan_result(path_g, env, res, robot_name, smooth=smooth)
+
+
+async def _avoid_reservations(path_g, env, res, robot_name):
+    """
+    (path, smooth) for a planned cell path: when it runs into cells other
+    busy robots hold, a SpaceTimeAStar path around them (already smoothed
+    between its waits), else path_g unchanged for normal smoothing.
+    """
+    if not path_g or not USE_RESERVATIONS:
+        return path_g, True
+    table = build_reservations(robot_name, env.grid, res)
+    if not (table and table.conflicts(densify(path_g))):
+        return path_g, True
+    st_path = await asyncio.to_thread(SpaceTimeAStar(env, table).search, "robot")
+    if not st_path:
+        print(f"⚠️ No reservation-free path for {robot_name}; using the unreserved path.")
+        return path_g, True
+    shared.latest_astar_path = [env.cell_to_meters(p) for p in st_path]
+    # waits are repeated cells; only the moves between them are smoothed
+    return _smooth_between_waits(st_path, env, table), False
+
+
+def conflicts_with_reservations(path_m, grid, robot_name) -> bool:
+    """True if a path in meters (planned on `grid`) runs into cells other busy robots hold."""
+    if not path_m or not USE_RESERVATIONS:
+        return False
+    res = shared.MAP_RESOLUTION
+    table = build_reservations(robot_name, grid, res)
+    return bool(table) and table.conflicts(densify([meters_to_grid(x, y, grid, res) for (x, y) in path_m]))
+
+
+async def _plan_cells(env, grid, res, start_grid, goal_grid, robot_name):
+    """Cell path for env's start/goal: goal field, large-map planner, pool, then in-process."""
+    path_g = None
+    if USE_GOAL_FIELDS and goal_grid in _location_goal_cells(grid, res):
+        # Fixed label: descend its cost-to-go field. Only build a missing field
+        # on a frozen map; on a live map the field would be stale next step.
+        path_g = await asyncio.to_thread(
+            GOAL_FIELDS.plan, env, start_grid, goal_grid, shared.FREEZE_MAP
+        )
+        if path_g:
+            shared.latest_astar_path = [env.cell_to_meters(p) for p in path_g]
+            print(f"🧭 Goal-field path for {robot_name}: {len(path_g)} cells.")
+            return path_g
+
+    if grid.size >= COARSE_TO_FINE_MIN_CELLS:
+        if LARGE_MAP_PLANNER == "hpa":
+            path_g = await asyncio.to_thread(_hpa_plan, env)
+        else:
+            path_g = await asyncio.to_thread(
+                plan_coarse_to_fine, env, _pyramid_for(grid), COARSE_TO_FINE_FACTORS
+            )
+        if path_g:
+            return path_g
+
+    if USE_PROCESS_POOL:
+        service = planning_service()
+        try:
+            path_g = await service.plan(
+                grid, start_grid, goal_grid, res, PLANNER_SETTINGS, engine=PLANNER_ENGINE
+            )
+        except Exception as e:
+            # only this request falls back; other robots' pool plans keep running
+            print(f"⚠️ planning pool failed ({e!r}); planning in-process.")
+            if service.broken:
+                _replace_broken_planning_service(service)
+        else:
+            if path_g:
+                shared.latest_astar_path = [env.cell_to_meters(p) for p in path_g]
+            return path_g
+
+    engine = ENGINES.get(PLANNER_ENGINE, AStar)
+    return await asyncio.to_thread(engine(env).search, "robot")
+
+
+def _smooth_between_waits(path, env, table):
+    """
+    smooth_path each run of moves of a space-time path, keeping its waits
+    (repeated cells). A run whose shortcut would cut through a reservation
+    stays as planned.
+    """
+    if not SMOOTH_PATHS:
+        return path
+    runs = [[path[0]]]
+    for cell in path[1:]:
+        if cell == runs[-1][-1]:
+            runs.append([cell])
+        else:
+            runs[-1].append(cell)
+    out = []
+    for run in runs:
+        # only the first run needs the executor's verbatim head
+        smoothed = smooth_path(run, env, keep_head=0 if out else 2)
+        out.extend(run if table.conflicts(densify(out + smoothed)) else smoothed)
+    return out
+
+
+def _incremental_plan(robot_name, env, start_grid, goal_grid, publish=True):
+    """Run (or repair) the robot's D* Lite planner on env; blocking."""
+    planner = _REPLANNERS.get(robot_name)
+    if planner is None or not planner.compatible(env):
+        # seed from a cached goal field when the map matches, else search once
+        field = GOAL_FIELDS.field(env, goal_grid, build=False) if USE_GOAL_FIELDS else None
+        planner = DStarLite(env, field=field)
+        _REPLANNERS[robot_name] = planner
+    else:
+        changed = planner.update_map(env)
+        print(f"♻️ {robot_name} replan: {changed} cells changed since last plan.")
+    path_g = planner.plan(start_grid)
+    if path_g and publish:
+        shared.latest_astar_path = [env.cell_to_meters(p) for p in path_g]
+    return path_g
+
+
+async def _warm_replanner(start_pos, goal_pos, robot_name):
+    """Run the robot's first D* Lite search on the current map without publishing a path."""
+    setup = _plan_setup(start_pos, goal_pos)
+    if setup is None:
+        return
+    view, res, start_grid, goal_grid = setup
+    with view:
+        env = _planning_env(view.costmap, start_grid, goal_grid, res)
+        await asyncio.to_thread(_incremental_plan, robot_name, env, start_grid, goal_grid, False)
+
+
+def start_replanner_warmup(start_pos, goal_pos, robot_name):
+    """
+    Build the robot's D* Lite planner in the background while it drives its
+    first leg (planned with the faster one-shot planners), so the first
+    replan_path call repairs that search instead of starting a full one.
+    """
+    _REPLANNER_WARMUPS[robot_name] = asyncio.create_task(
+        _warm_replanner(start_pos, goal_pos, robot_name)
+    )
+
+
+async def _finish_replanner_warmup(robot_name):
+    """Wait for the robot's pending warm-up, if any; a failed one just means a full search later."""
+    task = _REPLANNER_WARMUPS.pop(robot_name, None)
+    if task is None:
+        return
+    try:
+        await task
+    except Exception as e:
+        print(f"⚠️ {robot_name}: replanner warm-up failed ({e!r}).")
+
+
+async def replan_path(start_pos, goal_pos, robot_name):
+    """
+    Like plan_path, but keeps a per-robot incremental planner between calls:
+    only the nodes affected by cells that changed since the last call are
+    repaired. Returns (path_in_meters, planning_grid) or (None, None).
+    """
+    await _finish_replanner_warmup(robot_name)
+    setup = _plan_setup(start_pos, goal_pos)
+    if setup is None:
+        return None, None
+    view, res, start_grid, goal_grid = setup
+
+    with view:
+        env = _planning_env(view.costmap, start_grid, goal_grid, res)
+        path_g = await asyncio.to_thread(_incremental_plan, robot_name, env, start_grid, goal_grid)
+        path_g, smooth = await _avoid_reservations(path_g, env, res, robot_name)
+        return _plan_result(path_g, env, res, robot_name, smooth=smooth)
+
+
 # -----------------------------------------------------------------------------
 # Robot selection
 # -----------------------------------------------------------------------------
 
+def _rank_by_path_cost(goal_pos, starts):
+    """
+    Rank robots by true planning cost to `goal_pos` with ONE reverse search.
+
+    Args:
+        goal_pos: (x, y) goal in meters.
+        starts: {robot_id: (x, y)} start positions in meters.
+
+    Returns:
+        (ranking, path_g, grid): ranking is [(cost, robot_id, start_pos)] in
+        ascending cost (robots that cannot reach the goal are left out), path_g
+        is the best robot's path in cells (or None) and grid the planning grid.
+    """
+    with planning_snapshot(shared.INFLATION_RADIUS_M) as view:
+        return _rank_on_grid(view.costmap, goal_pos, starts)
+
+
+def _rank_on_grid(grid, goal_pos, starts):
+    """_rank_by_path_cost on one planning grid."""
+    if grid.size == 0:
+        return [], None, grid
+
+    res = shared.MAP_RESOLUTION
+    H, W = grid.shape
+    goal_grid = meters_to_grid(goal_pos[0], goal_pos[1], grid, res)
+    if not (0 <= goal_grid[0] < W and 0 <= goal_grid[1] < H):
+        return [], None, grid
+
+    cells = {}
+    for rid, pos in starts.items():
+        gx, gy = meters_to_grid(pos[0], pos[1], grid, res)
+        if 0 <= gx < W and 0 <= gy < H:
+            cells[rid] = (gx, gy)
+    if not cells:
+        return [], None, grid
+
+    env = _planning_env(grid, goal_grid, goal_grid, res)
+
+    # A cached label field already has every cell settled; otherwise stop the
+    # reverse search as soon as every candidate's cell is settled.
+    field = GOAL_FIELDS.field(env, goal_grid, build=False) if USE_GOAL_FIELDS else None
+    if field is None:
+        field = cost_to_go(env, goal_grid, targets=cells.values())
+
+    ranking = sorted(
+        (float(field[cy, cx]), rid, starts[rid])
+        for rid, (cx, cy) in cells.items()
+        if math.isfinite(field[cy, cx])
+    )
+    if not ranking:
+        return [], None, grid
+
+    path_g = descend(env, field, cells[ranking[0][1]])
+    if path_g and SMOOTH_PATHS:
+        path_g = smooth_path(path_g, env)
+    return ranking, path_g, grid
+
+
+async def assign_robot_by_path_cost(goal_pos, starts):
+    """
+    Pick the robot in `starts` ({robot_id: (x, y)}) with the cheapest route to goal_pos.
+    Returns (robot_id, start_pos, planned) where planned is (path_in_meters, grid)
+    ready to hand to excute, or (None, None, None) if no robot can reach the goal.
+    """
+    ranking, path_g, grid = await asyncio.to_thread(_rank_by_path_cost, goal_pos, starts)
+    if not ranking:
+        return None, None, None
+
+    for cost, rid, _pos in ranking:
+        print(f"  📏 {rid}: path cost {cost:.2f}")
+    _, robot_id, start_pos = ranking[0]
+
+    planned = None
+    if path_g:
+        res = shared.MAP_RESOLUTION
+        planned = ([grid_to_meters(x, y, grid, res) for (x, y) in path_g], grid)
+    return robot_id, start_pos, planned
+
+
 async def find_available_robot(sim, goal_pos):
     """
-    Loop over Rob0/Rob1/Rob2, pick the nearest IDLE robot.
-    Returns (robot_id, start_pos) or (None, None).
+    Loop over Rob0/Rob1/Rob2, pick the IDLE robot with the cheapest planned route.
+    Falls back to straight-line distance if no robot can reach the goal on the map.
+    Returns (robot_id, start_pos, planned) or (None, None, None); planned is
+    (path_in_meters, grid) for excute, or None.
     """
     candidates = []
 
@@ -140,21 +524,28 @@ async def find_available_robot(sim, goal_pos):
 
     if not candidates:
         print("⛔ No available idle robots.")
-        return None, None
+        return None, None, None
 
-    robot_id, start_pos, _ = min(candidates, key=lambda x: x[2])
-    print(f"✅ Nearest available robot: {robot_id} at {start_pos}")
-    return robot_id, start_pos
+    robot_id, start_pos, planned = await assign_robot_by_path_cost(
+        goal_pos, {rid: pos for rid, pos, _ in candidates}
+    )
+    if robot_id is None:
+        robot_id, start_pos, _ = min(candidates, key=lambda x: x[2])
+        print(f"⚠️ No robot has a planned route; nearest by distance: {robot_id}")
+    print(f"✅ Cheapest available robot: {robot_id} at {start_pos}")
+    return robot_id, start_pos, planned
 
 
 # -----------------------------------------------------------------------------
 # Execution
 # -----------------------------------------------------------------------------
 
-async def excute(sim, start_pos, start_ori, robot_name, goal_pos):
+async def excute(sim, start_pos, start_ori, robot_name, goal_pos, planned=None):
     """
     Execute motion for `robot_name` from start_pos/orientation to goal_pos.
     Handles replanning, aborts, and final state updates. Returns "DONE" or "FAILED".
+    `planned` may carry a (path_in_meters, grid) already computed at dispatch;
+    it is used for the first leg instead of planning again.
     """
     model = ID_TO_MODEL.get(robot_name)
     if not model:
@@ -171,6 +562,9 @@ async def excute(sim, start_pos, start_ori, robot_name, goal_pos):
     motion = OmniRobotMotion.RobotMotion(sim, controller.wheels)  # create once
     t0 = None
     max_replans = 8
+    replanning = False
+    await _finish_replanner_warmup(robot_name)  # a stale warm-up must not land after the reset
+    _REPLANNERS.pop(robot_name, None)  # new mission → fresh incremental planner
     for _ in range(max_replans):
         # hard stop requested? stop wheels and exit
         if shared.robot_abort.get(robot_name):
@@ -186,8 +580,25 @@ async def excute(sim, start_pos, start_ori, robot_name, goal_pos):
         if t0 is None:
             t0 = time()
 
-        # A* offloaded so other robots can plan too
-        path_in_meters, plan_grid = await plan_path(start_pos, goal_pos, robot_name)
+        if planned is not None and conflicts_with_reservations(planned[0], planned[1], robot_name):
+            # robots dispatched since the assignment now hold cells on it
+            print(f"🚧 {robot_name}: assigned path crosses reserved cells; planning again.")
+            planned = None
+        if planned is not None:
+            # path computed while choosing this robot
+            path_in_meters, plan_grid = planned
+            planned = None
+            shared.latest_astar_path_by_robot[robot_name] = list(path_in_meters)
+            shared.planned_path_by_robot[robot_name] = list(path_in_meters)
+        elif replanning:
+            # repair the previous search instead of planning from scratch
+            path_in_meters, plan_grid = await replan_path(start_pos, goal_pos, robot_name)
+        else:
+            # A* offloaded so other robots can plan too
+            path_in_meters, plan_grid = await plan_path(start_pos, goal_pos, robot_name)
+
+        if path_in_meters and not replanning:
+            start_replanner_warmup(start_pos, goal_pos, robot_name)
 
         if not path_in_meters:
             await motion.stop()
@@ -218,6 +629,7 @@ async def excute(sim, start_pos, start_ori, robot_name, goal_pos):
 
         if result == "replanned":
             start_pos = await controller.get_position()
+            replanning = True
             continue
 
         if result == "DONE":
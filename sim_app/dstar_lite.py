@@ -0,0 +1,240 @@
+# sim_app/dstar_lite.py
+"""
+Incremental replanning (D* Lite, Koenig & Likhachev 2002).
+
+- DStarLite: searches backward from a fixed goal over an AStarEnvironment's
+  blocked mask and per-cell step costs (same costs as A*). Its g/rhs values and
+  priority queue persist between calls, so after the map changes only the
+  nodes whose cost-to-go is affected by the changed cells are repaired.
+- The search state can be seeded from a goal_fields cost-to-go field, in which
+  case the very first plan is already free.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from sim_app.astar_env import _DIRS
+
+# Octile h is exact along open straight lines, so queue keys tie with the
+# start's key and float round-off can end the search one step early. A tiny
+# shrink keeps h consistent while making those ties strict.
+_H_SCALE = 1.0 - 1e-9
+
+
+class DStarLite:
+    """
+    Persistent backward planner for one goal.
+
+    Args:
+        env: AStarEnvironment; its agent goal is the planner's goal.
+        field: optional exact cost-to-go field (H x W) for env's map, e.g.
+            from GoalFieldCache, used to start with a consistent state.
+
+    Usage:
+        planner = DStarLite(env)
+        path = planner.plan(start)           # full search the first time
+        planner.update_map(new_env)          # repair only what changed
+        path = planner.plan(new_start)
+    """
+
+    def __init__(self, env, field: np.ndarray | None = None):
+        self.env = env
+        self.goal = tuple(env.agent_dict["robot"]["goal"])
+        self.shape = (env.H, env.W)
+        self.W = env.W + 2
+        n = self.W * (env.H + 2)
+
+        self._kind_arr, self._cost_arr = self._tables(env)
+        self.kind, self.cell_cost = self._kind_arr.tolist(), self._cost_arr.tolist()
+        self.nbrs = [(dy * self.W + dx, step) for dx, dy, step in _DIRS]
+
+        inf = math.inf
+        self.g = [inf] * n
+        self.rhs = [inf] * n
+        self.open_heap = []
+        self.open_key = {}      # idx -> current key (heap entries not matching are stale)
+        self.km = 0.0
+
+        # Keys are relative to the last planning start; until the first plan()
+        # that is the goal itself (plan() then adds the start's offset to km).
+        self.goal_idx = self._index(self.goal)
+        self.start_idx = self.last_start = self.goal_idx
+        self.rhs[self.goal_idx] = 0.0
+        if field is not None:
+            padded = np.full((env.H + 2, self.W), inf)
+            padded[1:-1, 1:-1] = field
+            self.g = padded.ravel().tolist()
+            self.rhs = list(self.g)
+        else:
+            self._push(self.goal_idx, self._key(self.goal_idx))
+
+    # ------------------------------------------------------------------ #
+    # Grid helpers
+    # ------------------------------------------------------------------ #
+
+    def _tables(self, env):
+        """Padded flat kind (0 free, 1 blocked, 2 outside) and cell-cost arrays."""
+        kind = np.full((env.H + 2, env.W + 2), 2, dtype=np.uint8)
+        kind[1:-1, 1:-1] = env._blocked.astype(bool)
+        cost = np.zeros((env.H + 2, env.W + 2), dtype=np.float64)
+        cost[1:-1, 1:-1] = env.cell_cost
+        return kind.ravel(), cost.ravel()
+
+    def _index(self, cell) -> int:
+        return (cell[1] + 1) * self.W + (cell[0] + 1)
+
+    def _cell(self, idx: int) -> tuple[int, int]:
+        y, x = divmod(idx, self.W)
+        return x - 1, y - 1
+
+    def _h_between(self, a: int, b: int) -> float:
+        """Octile distance between two flat indices (admissible: step costs >= 1 / sqrt 2)."""
+        ay, ax = divmod(a, self.W)
+        by, bx = divmod(b, self.W)
+        dx, dy = abs(ax - bx), abs(ay - by)
+        return _H_SCALE * (max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy))
+
+    def _cost(self, v: int, step: float) -> float:
+        """Cost of stepping into v (inf if v is blocked or outside)."""
+        if self.kind[v]:
+            return math.inf
+        return step + self.cell_cost[v]
+
+    # ------------------------------------------------------------------ #
+    # Queue
+    # ------------------------------------------------------------------ #
+
+    def _key(self, s: int) -> tuple[float, float]:
+        m = min(self.g[s], self.rhs[s])
+        return (m + self._h_between(self.start_idx, s) + self.km, m)
+
+    def _push(self, s: int, key) -> None:
+        self.open_key[s] = key
+        heapq.heappush(self.open_heap, (key, s))
+
+    def _top(self):
+        """Return (key, idx) of the best live queue entry, dropping stale ones."""
+        heap = self.open_heap
+        while heap:
+            key, s = heap[0]
+            if self.open_key.get(s) == key:
+                return key, s
+            heapq.heappop(heap)
+        return (math.inf, math.inf), None
+
+    def _update_vertex(self, u: int) -> None:
+        if u != self.goal_idx:
+            best = math.inf
+            g, kind, cell_cost = self.g, self.kind, self.cell_cost
+            for off, step in self.nbrs:
+                v = u + off
+                if kind[v]:
+                    continue
+                c = step + cell_cost[v] + g[v]
+                if c < best:
+                    best = c
+            self.rhs[u] = best
+        self.open_key.pop(u, None)
+        if self.g[u] != self.rhs[u]:
+            self._push(u, self._key(u))
+
+    def _compute_shortest_path(self) -> None:
+        start = self.start_idx
+        g, rhs = self.g, self.rhs
+        while True:
+            k_old, u = self._top()
+            if u is None:
+                return
+            if not (k_old < self._key(start) or rhs[start] != g[start]):
+                return
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u, k_new)
+                continue
+            heapq.heappop(self.open_heap)
+            del self.open_key[u]
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for off, _step in self.nbrs:
+                    s = u + off
+                    if self.kind[s] != 2:
+                        self._update_vertex(s)
+            else:
+                g[u] = math.inf
+                self._update_vertex(u)
+                for off, _step in self.nbrs:
+                    s = u + off
+                    if self.kind[s] != 2:
+                        self._update_vertex(s)
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def compatible(self, env) -> bool:
+        """True if `env` has the same map size and goal, so update_map() applies."""
+        return (env.H, env.W) == self.shape and tuple(env.agent_dict["robot"]["goal"]) == self.goal
+
+    def update_map(self, env) -> int:
+        """
+        Diff `env` against the planner's map and repair only the affected nodes.
+        Returns the number of changed cells.
+        """
+        kind_arr, cost_arr = self._tables(env)
+        changed = np.flatnonzero((kind_arr != self._kind_arr) | (cost_arr != self._cost_arr))
+        self.env = env
+        if changed.size == 0:
+            return 0
+
+        self._kind_arr, self._cost_arr = kind_arr, cost_arr
+        self.kind, self.cell_cost = kind_arr.tolist(), cost_arr.tolist()
+        kind = self.kind
+        # every edge INTO a changed cell changed: update its neighbors
+        touched = set()
+        for v in changed.tolist():
+            for off, _step in self.nbrs:
+                s = v + off
+                if kind[s] != 2:
+                    touched.add(s)
+        for s in touched:
+            self._update_vertex(s)
+        return int(changed.size)
+
+    def plan(self, start) -> list[tuple[int, int]] | None:
+        """Shortest path (list of cells) from `start` to the goal, or None."""
+        self.start_idx = self._index(tuple(start))
+        # keys queued before the move used the old start: shift by km
+        self.km += self._h_between(self.last_start, self.start_idx)
+        self.last_start = self.start_idx
+        self._compute_shortest_path()
+        return self._extract_path()
+
+    def _extract_path(self) -> list[tuple[int, int]] | None:
+        """
+        Follow argmin c + g from the start. Only consistent nodes (not queued)
+        are followed: queued nodes further from the start than the search
+        reached may still hold stale g values.
+        """
+        g, queued = self.g, self.open_key
+        s = self.start_idx
+        if not math.isfinite(g[s]):
+            return None
+        path = [self._cell(s)]
+        for _ in range(len(g)):
+            if s == self.goal_idx:
+                return path
+            best, best_val = None, math.inf
+            for off, step in self.nbrs:
+                v = s + off
+                if v in queued:
+                    continue
+                val = self._cost(v, step) + g[v]
+                if val < best_val:
+                    best, best_val = v, val
+            if best is None or not math.isfinite(best_val):
+                return None
+            s = best
+            path.append(self._cell(s))
+        return None
@@ -0,0 +1,216 @@
+# sim_app/goal_fields.py
+"""
+Goal-rooted cost-to-go fields.
+
+- cost_to_go: reverse Dijkstra from a goal cell over an AStarEnvironment's
+  blocked mask and per-cell step cost (same costs as A*). Can stop early once
+  a set of target cells is settled.
+- descend: follow a field downhill from any start cell to its goal in
+  O(path length).
+- GoalFieldCache: one field per fixed goal cell (shared.LOCATION_MAP labels),
+  persisted next to map_memory.npz and dropped when the planning map changes.
+"""
+
+import hashlib
+import heapq
+import math
+import os
+import threading
+
+import numpy as np
+
+from sim_app import shared
+from sim_app.astar_env import _DIRS
+
+
+# ============================================================================
+# Reverse search
+# ============================================================================
+
+def cost_to_go(env, goal, targets=None) -> np.ndarray:
+    """
+    Cost of the cheapest path from every cell to `goal` (H x W float64, inf = unreachable).
+
+    Edge costs match AStarEnvironment.get_neighbors: moving into cell v costs
+    step(1 or sqrt 2) + env.cell_cost[v], and blocked cells are never entered
+    (a blocked start cell still gets a value, as A* may leave it).
+
+    Args:
+        env: AStarEnvironment providing the grid, blocked mask and cell costs.
+        goal: (cx, cy) goal cell.
+        targets: optional iterable of cells; the search stops as soon as all
+            of them are settled. Values of cells settled before that are exact,
+            others are upper bounds (descend() from a settled cell stays exact).
+    """
+    W, H = env.W + 2, env.H + 2
+
+    # kind: 0 = free, 1 = blocked, 2 = outside (padding border)
+    kind = np.full((H, W), 2, dtype=np.uint8)
+    kind[1:-1, 1:-1] = env._blocked.astype(bool)
+    kind = kind.ravel().tolist()
+    cell_cost = np.zeros((H, W), dtype=np.float64)
+    cell_cost[1:-1, 1:-1] = env.cell_cost
+    cell_cost = cell_cost.ravel().tolist()
+    offsets = [(dy * W + dx, step) for dx, dy, step in _DIRS]
+
+    inf = math.inf
+    dist = [inf] * (W * H)
+    settled = bytearray(W * H)
+    goal_idx = (goal[1] + 1) * W + (goal[0] + 1)
+    dist[goal_idx] = 0.0
+    heap = [(0.0, goal_idx)]
+
+    pending = None
+    if targets is not None:
+        pending = {(ty + 1) * W + (tx + 1) for tx, ty in targets}
+
+    while heap:
+        d, v = heapq.heappop(heap)
+        if settled[v]:
+            continue
+        settled[v] = 1
+        if pending is not None:
+            pending.discard(v)
+            if not pending:
+                break
+        # nothing can step INTO a blocked cell, so it has no predecessors
+        if kind[v]:
+            continue
+        enter = cell_cost[v]
+        for off, step in offsets:
+            u = v + off
+            if settled[u] or kind[u] == 2:
+                continue
+            nd = d + step + enter
+            if nd < dist[u]:
+                dist[u] = nd
+                heapq.heappush(heap, (nd, u))
+
+    return np.asarray(dist, dtype=np.float64).reshape(H, W)[1:-1, 1:-1].copy()
+
+
+def descend(env, field: np.ndarray, start) -> list[tuple[int, int]] | None:
+    """
+    Walk `field` downhill from `start` to its zero (the goal).
+
+    Each step moves to the neighbor minimizing step + cell_cost + field, which
+    reproduces an optimal path. Returns a list of (cx, cy) cells or None if
+    the start is unreachable.
+    """
+    x, y = start
+    if not (0 <= x < env.W and 0 <= y < env.H) or not np.isfinite(field[y, x]):
+        return None
+
+    path = [(x, y)]
+    while field[y, x] > 0.0:
+        here = field[y, x]
+        best, best_val = None, math.inf
+        for dx, dy, step in _DIRS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < env.W and 0 <= ny < env.H) or env._blocked[ny, nx]:
+                continue
+            there = field[ny, nx]
+            # strictly downhill guards against float32 round-off plateaus
+            if not there < here:
+                continue
+            val = step + env.cell_cost[ny, nx] + there
+            if val < best_val:
+                best, best_val = (nx, ny), val
+        if best is None:
+            return None
+        x, y = best
+        path.append(best)
+    return path
+
+
+# ============================================================================
+# Per-goal cache (persisted)
+# ============================================================================
+
+def map_signature(env) -> str:
+    """Digest of everything a field depends on: shape, blocked mask and cell costs."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.asarray(env._blocked.shape, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(env._blocked, dtype=np.uint8).tobytes())
+    h.update(np.ascontiguousarray(env.cell_cost, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class GoalFieldCache:
+    """
+    Cost-to-go fields keyed by goal cell, valid for one planning map.
+
+    The cache is tagged with map_signature(env). When a plan arrives on a
+    different map the in-RAM fields are dropped (or reloaded from disk if the
+    file was written for that map). Thread-safe: plan_path calls it from
+    worker threads.
+    """
+
+    def __init__(self, path: str = shared.GOAL_FIELDS_FILE):
+        self.path = path
+        self.signature = None
+        self.fields: dict[tuple[int, int], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _sync(self, env) -> None:
+        sig = map_signature(env)
+        if sig == self.signature:
+            return
+        self.signature = sig
+        self.fields = {}
+        self._load(sig)
+
+    def _load(self, sig: str) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            data = np.load(self.path)
+            if str(data["signature"]) != sig:
+                return
+            for (gx, gy), f in zip(data["goals"].tolist(), data["fields"]):
+                self.fields[(int(gx), int(gy))] = f.astype(np.float64)
+            print(f"✅ loaded {len(self.fields)} goal fields from: {self.path}")
+        except Exception as e:
+            print(f"⚠️ failed to load goal fields ({self.path}): {e}")
+
+    def save(self) -> None:
+        """Persist all fields for the current map (float32, compressed)."""
+        with self._lock:
+            if not self.fields:
+                return
+            goals = sorted(self.fields)
+            np.savez_compressed(
+                self.path,
+                signature=np.array(self.signature),
+                goals=np.asarray(goals, dtype=np.int32),
+                fields=np.stack([self.fields[g] for g in goals]).astype(np.float32),
+            )
+
+    def field(self, env, goal, build: bool = True) -> np.ndarray | None:
+        """Return the field for `goal` on env's map, building it if allowed."""
+        goal = tuple(goal)
+        with self._lock:
+            self._sync(env)
+            f = self.fields.get(goal)
+            if f is None and build:
+                f = cost_to_go(env, goal)
+                self.fields[goal] = f
+            return f
+
+    def warm(self, env, goals) -> None:
+        """Build any missing fields for `goals` and persist them."""
+        with self._lock:
+            self._sync(env)
+            missing = [tuple(g) for g in goals if tuple(g) not in self.fields]
+            for g in missing:
+                self.fields[g] = cost_to_go(env, g)
+        if missing:
+            self.save()
+            print(f"🧭 built {len(missing)} goal fields → {self.path}")
+
+    def plan(self, env, start, goal, build: bool = True):
+        """Path from `start` to `goal` by descending the goal's field, or None."""
+        f = self.field(env, goal, build=build)
+        if f is None:
+            return None
+        return descend(env, f, tuple(start))
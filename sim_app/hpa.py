@@ -0,0 +1,315 @@
+# sim_app/hpa.py
+"""
+Hierarchical path-finding (HPA*, Botea, Müller & Schaeffer 2004).
+
+- The grid of an AStarEnvironment is split into fixed-size square sectors.
+- Entrances: every maximal run of free cell pairs across a sector border gets
+  one transition (its middle) or, for long runs, two (its ends). Transition
+  cells are the abstract graph's nodes.
+- Intra-sector edges (cheapest cost between two nodes of one sector, staying
+  inside it) are computed lazily by a sector-bounded Dijkstra the first time
+  the abstract search expands a node, and cached.
+- A query links start/goal to the nodes of their sectors, runs A* on the small
+  abstract graph, then refines at full resolution with GridAStar restricted to
+  the sectors the abstract path touched.
+- update_map(env) diffs the new map against the old one and only recomputes
+  the borders and cached edges of the sectors that contain changed cells
+  (and the neighbors sharing those borders).
+
+Costs match AStarEnvironment / A*: moving into cell v costs step + cell_cost[v].
+"""
+
+import heapq
+import math
+from itertools import count
+
+import numpy as np
+
+from sim_app.astar import GridAStar
+from sim_app.astar_env import _DIRS
+
+# Runs of free border pairs at least this long get two transitions (at the ends)
+_LONG_ENTRANCE = 6
+
+
+class HPAGraph:
+    """
+    Args:
+        env: AStarEnvironment the graph abstracts (blocked mask + cell costs).
+        sector_cells: sector side length in cells.
+
+    Usage:
+        graph = HPAGraph(env)
+        path = graph.search(env)      # list of cells or False
+        graph.update_map(new_env)     # after the map changed
+    """
+
+    def __init__(self, env, sector_cells: int = 16):
+        self.S = int(sector_cells)
+        self.H, self.W = env.H, env.W
+        self.nsx = -(-self.W // self.S)
+        self.nsy = -(-self.H // self.S)
+        self.PW = self.W + 2
+        self.nbrs = [(dy * self.PW + dx, step) for dx, dy, step in _DIRS]
+        self.expansions = 0  # abstract nodes closed by the last search
+
+        # padded sector id per flat index (-1 outside the grid)
+        ys, xs = np.mgrid[0:self.H, 0:self.W]
+        sector = np.full((self.H + 2, self.PW), -1, dtype=np.int64)
+        sector[1:-1, 1:-1] = (ys // self.S) * self.nsx + (xs // self.S)
+        self.sector_of = sector.ravel().tolist()
+
+        self.env = env
+        self._load_tables(env)
+        self.borders: dict[tuple[int, int], list[tuple[int, int]]] = {}
+        for s in range(self.nsx * self.nsy):
+            for t in self._neighbor_sectors(s, forward_only=True):
+                self.borders[(s, t)] = self._border_transitions(s, t)
+        self.nodes: dict[int, set[int]] = {}
+        for s in range(self.nsx * self.nsy):
+            self._collect_nodes(s)
+        self.intra: dict[int, dict[int, float]] = {}
+
+    # ------------------------------------------------------------------ #
+    # Map tables
+    # ------------------------------------------------------------------ #
+
+    def _load_tables(self, env) -> None:
+        blocked = np.ones((self.H + 2, self.PW), dtype=bool)
+        blocked[1:-1, 1:-1] = env._blocked.astype(bool)
+        cost = np.zeros((self.H + 2, self.PW), dtype=np.float64)
+        cost[1:-1, 1:-1] = env.cell_cost
+        self._blocked_arr, self._cost_arr = blocked, cost
+        self.blocked = blocked.ravel().tolist()
+        self.cell_cost = cost.ravel().tolist()
+
+    def _index(self, cell) -> int:
+        return (cell[1] + 1) * self.PW + (cell[0] + 1)
+
+    def _sector_box(self, s: int) -> tuple[int, int, int, int]:
+        """(x0, y0, x1, y1) half-open cell box of sector s."""
+        sy, sx = divmod(s, self.nsx)
+        return sx * self.S, sy * self.S, min(self.W, (sx + 1) * self.S), min(self.H, (sy + 1) * self.S)
+
+    def _neighbor_sectors(self, s: int, forward_only: bool = False):
+        sy, sx = divmod(s, self.nsx)
+        if sx + 1 < self.nsx:
+            yield s + 1
+        if sy + 1 < self.nsy:
+            yield s + self.nsx
+        if not forward_only:
+            if sx > 0:
+                yield s - 1
+            if sy > 0:
+                yield s - self.nsx
+
+    # ------------------------------------------------------------------ #
+    # Entrances
+    # ------------------------------------------------------------------ #
+
+    def _border_transitions(self, s: int, t: int) -> list[tuple[int, int]]:
+        """Transitions (idx in s, idx in t) across the border of s and its right/lower neighbor t."""
+        x0, y0, x1, y1 = self._sector_box(s)
+        b = self._blocked_arr
+        if t == s + 1:
+            # vertical border: columns x1-1 | x1, rows y0..y1
+            a_cells = [(x1 - 1, y) for y in range(y0, y1)]
+            free = ~b[y0 + 1:y1 + 1, x1] & ~b[y0 + 1:y1 + 1, x1 + 1]
+            pair = lambda c: (c, (c[0] + 1, c[1]))
+        else:
+            # horizontal border: rows y1-1 | y1, columns x0..x1
+            a_cells = [(x, y1 - 1) for x in range(x0, x1)]
+            free = ~b[y1, x0 + 1:x1 + 1] & ~b[y1 + 1, x0 + 1:x1 + 1]
+            pair = lambda c: (c, (c[0], c[1] + 1))
+
+        out = []
+        run_start = None
+        flags = free.tolist() + [False]
+        for i, f in enumerate(flags):
+            if f and run_start is None:
+                run_start = i
+            elif not f and run_start is not None:
+                length = i - run_start
+                picks = [run_start, i - 1] if length >= _LONG_ENTRANCE else [run_start + length // 2]
+                for k in picks:
+                    a, c = pair(a_cells[k])
+                    out.append((self._index(a), self._index(c)))
+                run_start = None
+        return out
+
+    def _sector_borders(self, s: int):
+        for t in self._neighbor_sectors(s):
+            yield (s, t) if s < t else (t, s)
+
+    def _collect_nodes(self, s: int) -> None:
+        nodes = set()
+        for key in self._sector_borders(s):
+            for a, b in self.borders.get(key, ()):
+                nodes.add(a if self.sector_of[a] == s else b)
+        self.nodes[s] = nodes
+
+    def _crossings(self, u: int):
+        """(v, cost) transitions leaving node u into a neighboring sector."""
+        s = self.sector_of[u]
+        for key in self._sector_borders(s):
+            for a, b in self.borders.get(key, ()):
+                if a == u:
+                    yield b, 1.0 + self.cell_cost[b]
+                elif b == u:
+                    yield a, 1.0 + self.cell_cost[a]
+
+    # ------------------------------------------------------------------ #
+    # Sector-bounded Dijkstra
+    # ------------------------------------------------------------------ #
+
+    def _sector_dijkstra(self, src: int, targets, reverse: bool = False) -> dict[int, float]:
+        """
+        Costs from src to each target (reverse=False) or from each target to
+        src (reverse=True), moving only through src's sector.
+        """
+        s = self.sector_of[src]
+        sector_of, blocked, cell_cost = self.sector_of, self.blocked, self.cell_cost
+        pending = set(targets)
+        pending.discard(src)
+        out = {src: 0.0} if src in targets else {}
+        dist = {src: 0.0}
+        heap = [(0.0, src)]
+        done = set()
+        while heap and pending:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            if u in pending:
+                pending.discard(u)
+                out[u] = d
+            for off, step in self.nbrs:
+                v = u + off
+                if sector_of[v] != s or blocked[v]:
+                    continue
+                # reverse: the step is v -> u, so it pays for entering u
+                nd = d + step + (cell_cost[u] if reverse else cell_cost[v])
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return out
+
+    def _intra_edges(self, u: int) -> dict[int, float]:
+        edges = self.intra.get(u)
+        if edges is None:
+            edges = self._sector_dijkstra(u, self.nodes[self.sector_of[u]])
+            edges.pop(u, None)
+            self.intra[u] = edges
+        return edges
+
+    # ------------------------------------------------------------------ #
+    # Query
+    # ------------------------------------------------------------------ #
+
+    def _h(self, a: int, b: int) -> float:
+        ay, ax = divmod(a, self.PW)
+        by, bx = divmod(b, self.PW)
+        dx, dy = abs(ax - bx), abs(ay - by)
+        return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+    def abstract_path(self, start, goal) -> list[int] | None:
+        """Abstract node sequence (flat indices, start and goal included) or None."""
+        s_idx, g_idx = self._index(start), self._index(goal)
+        if self.blocked[g_idx]:
+            return None
+        s_sec, g_sec = self.sector_of[s_idx], self.sector_of[g_idx]
+        start_edges = self._sector_dijkstra(s_idx, self.nodes[s_sec] | {g_idx})
+        goal_edges = self._sector_dijkstra(g_idx, self.nodes[g_sec], reverse=True)
+
+        self.expansions = 0
+        tie = count()
+        g_score = {s_idx: 0.0}
+        came = {}
+        heap = [(self._h(s_idx, g_idx), next(tie), s_idx)]
+        closed = set()
+        while heap:
+            _f, _, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            if u == g_idx:
+                path = [u]
+                while path[-1] in came:
+                    path.append(came[path[-1]])
+                return path[::-1]
+            closed.add(u)
+            self.expansions += 1
+
+            if u == s_idx:
+                edges = list(start_edges.items())
+                if s_idx in self.nodes[s_sec]:
+                    # a start on a transition can cross its border directly
+                    edges += list(self._crossings(u))
+            else:
+                edges = list(self._intra_edges(u).items()) + list(self._crossings(u))
+                if u in goal_edges:
+                    edges.append((g_idx, goal_edges[u]))
+            gu = g_score[u]
+            for v, c in edges:
+                nd = gu + c
+                if nd < g_score.get(v, math.inf):
+                    g_score[v] = nd
+                    came[v] = u
+                    heapq.heappush(heap, (nd + self._h(v, g_idx), next(tie), v))
+        return None
+
+    def search(self, env):
+        """
+        Plan env's "robot" start → goal. `env` must be on the graph's map
+        (call update_map first); the fine search uses env's costs, restricted
+        to the sectors the abstract path passes through.
+
+        Returns:
+            List of cells, or False if the abstract graph has no route.
+        """
+        start = tuple(env.agent_dict["robot"]["start"])
+        goal = tuple(env.agent_dict["robot"]["goal"])
+        nodes = self.abstract_path(start, goal)
+        if nodes is None:
+            return False
+        sectors = {self.sector_of[i] for i in nodes}
+        allowed = np.zeros((self.H, self.W), dtype=bool)
+        for s in sectors:
+            x0, y0, x1, y1 = self._sector_box(s)
+            allowed[y0:y1, x0:x1] = True
+        print(f"🔍 HPA*: {len(nodes)} abstract nodes, {len(sectors)} sectors refined.")
+        return GridAStar(env, allowed=allowed).search("robot")
+
+    # ------------------------------------------------------------------ #
+    # Map updates
+    # ------------------------------------------------------------------ #
+
+    def compatible(self, env) -> bool:
+        """True if update_map(env) can be used (same grid shape)."""
+        return (env.H, env.W) == (self.H, self.W)
+
+    def update_map(self, env) -> int:
+        """
+        Diff `env` against the graph's map; recompute entrances and drop cached
+        edges only for sectors with changed cells and their neighbors.
+        Returns the number of sectors recomputed.
+        """
+        old_blocked, old_cost = self._blocked_arr, self._cost_arr
+        self.env = env
+        self._load_tables(env)
+        changed = (self._blocked_arr != old_blocked) | (self._cost_arr != old_cost)
+        if not changed.any():
+            return 0
+
+        ys, xs = np.nonzero(changed[1:-1, 1:-1])
+        dirty = set(((ys // self.S) * self.nsx + (xs // self.S)).tolist())
+        touched = set(dirty)
+        for s in dirty:
+            for key in self._sector_borders(s):
+                self.borders[key] = self._border_transitions(*key)
+                touched.update(key)
+        for s in touched:
+            old_nodes = self.nodes.get(s, set())
+            self._collect_nodes(s)
+            for u in old_nodes | self.nodes[s]:
+                self.intra.pop(u, None)
+        return len(dirty)
@@ -7,9 +7,17 @@ import time
 
 from sim_app.sim_client import get_sim
 from sim_app import shared
-from sim_app.check_nearest_robot import excute
+from sim_app.map_builder import rebuild_costmap, update_memory_with_fleet
+from sim_app.check_nearest_robot import (
+    assign_robot_by_path_cost,
+    excute,
+    prepare_goal_fields,
+    shutdown_planning_service,
+)
 from sim_app.robot_controller import OmniRobotController
 from sim_app.path_viz import live_plotter
+from sim_app.sensor_poller import poller_for, start_pollers, stop_pollers
+from sim_app.sensor_log import record_tick, start_recording, stop_recording
 
 
 ROBOT_IDS = ["Rob0", "Rob1", "Rob2"]
@@ -19,25 +27,8 @@ GOAL_FILE = "shared_goal.json"
 CMD_FILE = "shared_cmd.json"
 REPLY_FILE = "shared_reply.json"
 
-# Mirror LLM location map (or move into shared if you prefer)
-LOCATION_MAP = {
-    "Meetings Table": (-1.500, -7.000),
-    "Office Table": (-2.000, 2.000),
-    "Cupboard A": (6.800, 1.000),
-    "Cupboard B": (3.800, 1.000),
-    "Cupboard C": (3.800, -3.000),
-    "Cupboard D": (6.800, -3.000),
-    "Meetings Rack": (-4.500, -4.000),
-    "Office Rack": (-4.500, 0.000),
-    "Rack A": (8.000, -5.000),
-    "Rack B": (5.000, -5.000),
-    "Rack C": (8.000, -9.000),
-    "Rack D": (5.000, -9.000),
-    "Rack 1": (3.000, -2.000),
-    "Rack 2": (3.000, -6.000),
-    "Rack 3": (3.000, -10.000),
-    "test" : (7.000, -0.700),
-}
+# Mirror LLM location map (kept in shared so the planner can see it)
+LOCATION_MAP = shared.LOCATION_MAP
 
 
 # -----------------------------------------------------------------------------
@@ -75,6 +66,31 @@ async def refresh_all_robot_states(ctrls):
             print(f"⚠️ Failed refresh for {rid}: {e}")
 
 
+def map_fresh_scans(mapped_seq):
+    """
+    Fuse every robot's newest poller frame into the map in one batch, right
+    after the poses were refreshed. A frame is mapped once, and only if it
+    is recent enough to go with the pose just read. `mapped_seq` holds the
+    last mapped frame per robot.
+    """
+    if shared.FREEZE_MAP:
+        return
+    fresh = []
+    for rid in ROBOT_IDS:
+        poller = poller_for(rid)
+        if poller is None:
+            continue
+        frame = poller.latest()
+        if frame.seq != mapped_seq.get(rid, 0) and frame.age() <= poller.period:
+            fresh.append(rid)
+        mapped_seq[rid] = frame.seq
+    if not fresh:
+        return
+    update_memory_with_fleet(fresh)
+    rebuild_costmap(inflation_radius_m=shared.INFLATION_RADIUS_M)
+    shared.maybe_autosave(every_n_updates=25)
+
+
 # -----------------------------------------------------------------------------
 # File IO helpers
 # -----------------------------------------------------------------------------
@@ -114,18 +130,24 @@ async def handle_goal_file(conns, active_tasks):
         return
 
     (key, goal) = list(data.items())[0]
+    planned = None
     if key == "auto":
-        candidates = []
-        for rid in ROBOT_IDS:
-            if shared.robot_status.get(rid) not in (None, "idle"):
-                continue
-            rx, ry = shared.robot_positions.get(rid, (0.0, 0.0))
-            d = math.hypot(goal[0] - rx, goal[1] - ry)
-            candidates.append((d, rid))
-        if not candidates:
+        starts = {
+            rid: shared.robot_positions.get(rid, (0.0, 0.0))
+            for rid in ROBOT_IDS
+            if shared.robot_status.get(rid) in (None, "idle")
+        }
+        if not starts:
             print("⛔ No idle robots available for auto-dispatch.")
             return
-        _, robot_name = min(candidates)
+        # rank by real route cost (one reverse search from the goal)
+        robot_name, _start, planned = await assign_robot_by_path_cost(goal, starts)
+        if robot_name is None:
+            # nobody can reach it on the planning map: fall back to straight line
+            _, robot_name = min(
+                (math.hypot(goal[0] - rx, goal[1] - ry), rid)
+                for rid, (rx, ry) in starts.items()
+            )
     else:
         robot_name = key
 
@@ -137,7 +159,9 @@ async def handle_goal_file(conns, active_tasks):
         start_pos = shared.robot_positions.get(robot_name, (0.0, 0.0))
         start_ori = shared.robot_orientation.get(robot_name, (0.0, 0.0, 0.0))
         _client, sim_r = conns[robot_name]  # use this robot's sim
-        task = asyncio.create_task(excute(sim_r, start_pos, start_ori, robot_name, goal))
+        task = asyncio.create_task(
+            excute(sim_r, start_pos, start_ori, robot_name, goal, planned=planned)
+        )
         active_tasks[robot_name] = task
 
 
@@ -208,6 +232,7 @@ async def run():
             pass
 
     shared.load_map()
+    await asyncio.to_thread(prepare_goal_fields)
 
     # build per-robot controllers and connections
     controllers, conns = await init_all_controllers()
@@ -217,15 +242,22 @@ async def run():
     await any_sim.startSimulation()
     print("✅ Connected & simulation started")
 
+    # background scan polling (executors read the latest frame instead of waiting on RPCs)
+    start_pollers({rid: sim for rid, (_client, sim) in conns.items()})
+    if shared.SENSOR_LOG_PATH:
+        start_recording(shared.SENSOR_LOG_PATH)
+
     # live plots
     for rid in ROBOT_IDS:
         asyncio.create_task(live_plotter(rid, period_s=0.5))
 
     active_tasks = {}
+    mapped_seq = {}  # rid -> last poller frame fused into the map
 
     try:
         while True:
             await refresh_all_robot_states(controllers)
+            map_fresh_scans(mapped_seq)
 
             # Move orders
             await handle_goal_file(conns, active_tasks)
@@ -263,6 +295,9 @@ async def run():
                         excute(sim_r, start_pos, start_ori, rid, home)
                     )
 
+            # one sensor-log frame per tick (no-op unless recording)
+            record_tick()
+
             await asyncio.sleep(0.05)
 
     except KeyboardInterrupt:
@@ -274,11 +309,18 @@ async def run():
         
         try:
             if not shared.FREEZE_MAP:
-                shared.save_map()
+                shared.save_map_async()
+            if not shared.flush_map_saves(timeout=30.0):
+                print("⚠️ Map save still running at exit")
+            elif not shared.FREEZE_MAP:
                 print(f"💾 Map saved to: {shared.MAP_FILE}")
         except Exception as e:
             print(f"⚠️ Failed to save map on exit: {e}")
 
+        shutdown_planning_service()
+        await stop_pollers()
+        stop_recording()
+
         # close all clients cleanly
         for client, _ in conns.values():
             await client.__aexit__(None, None, None)
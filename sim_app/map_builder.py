@@ -1,47 +1,70 @@
 # sim_app/map_builder.py
 """
 Map building utilities:
-- Stamp latest sensor hits into the global occupancy grid.
-- Inflate occupancy into a costmap (square neighborhood, original behavior).
-- Provide a planning-view costmap without mutating globals.
+- Stamp latest sensor hits into the tiled map of record (shared.map_tiles,
+  mirrored into the global_occupancy planning view), batched, with the
+  robot pose incl. yaw; one call can fuse the whole fleet. With
+  shared.MAP_LOGODDS, rays also clear free space through a log-odds layer.
+- Inflate occupancy into a costmap (square neighborhood, original behavior;
+  optional circular kernel).
+- Provide versioned, read-only planning snapshots shared by all readers,
+  with a max-pooled multi-resolution pyramid for coarse-to-fine planning.
 """
 
+import threading
+
 import numpy as np
 import sim_app.shared as shared  # import the module, not names
+from sim_app.astar_env import chebyshev_clearance
+from sim_app.sensor_fetch import SCAN_SENSORS, SENSOR_MOUNTS, scan_signals
 
 
 # ============================================================================
 # Helpers
 # ============================================================================
 
-def _center_indices(arr: np.ndarray) -> tuple[int, int]:
-    """Return (cx, cy) indices of the array center."""
-    return arr.shape[1] // 2, arr.shape[0] // 2
+def _dilate_axis(mask: np.ndarray, k: int, axis: int) -> np.ndarray:
+    """OR of `mask` over a window of +-k cells along one axis (clipped at the edges)."""
+    out = mask.copy()
+    n = mask.shape[axis]
+    for d in range(1, min(k, n - 1) + 1):
+        lo = [slice(None)] * mask.ndim
+        hi = [slice(None)] * mask.ndim
+        lo[axis], hi[axis] = slice(0, n - d), slice(d, n)
+        lo, hi = tuple(lo), tuple(hi)
+        out[lo] |= mask[hi]
+        out[hi] |= mask[lo]
+    return out
 
 
-def _world_to_grid(x: float, y: float, grid: np.ndarray, res: float) -> tuple[int, int]:
-    """Convert world (meters) → grid indices for the given grid and resolution."""
-    cx, cy = _center_indices(grid)
-    gx = int(round(cx + x / res))
-    gy = int(round(cy + y / res))
-    return gx, gy
+def _disk_offsets(k: int) -> list[tuple[int, int]]:
+    """(dy, dx) offsets of a disk of radius k cells, center excluded."""
+    return [
+        (dy, dx)
+        for dy in range(-k, k + 1)
+        for dx in range(-k, k + 1)
+        if (dy or dx) and dy * dy + dx * dx <= k * k
+    ]
 
 
-def _stamp_hit(grid: np.ndarray, wx: float, wy: float, res: float) -> None:
-    """Mark cell as occupied (1) if (wx, wy) falls inside the grid."""
-    gx, gy = _world_to_grid(wx, wy, grid, res)
-    if 0 <= gx < grid.shape[1] and 0 <= gy < grid.shape[0]:
-        grid[gy, gx] = 1
+def _inflate(binary_occ: np.ndarray, radius_m: float, res: float, kernel: str = "square") -> np.ndarray:
+    """
+    Inflate occupancy by radius_m.
 
+    kernel="square" keeps the original behavior: a cell is inflated if any
+    occupied cell lies within k = round(radius_m / res) cells in both x and y.
+    It is computed as two separable 1-D sliding-window maxima (row pass, then
+    column pass), so the cost is O(H*W*k) vectorized work instead of a
+    per-cell Python loop.
 
-def _inflate(binary_occ: np.ndarray, radius_m: float, res: float) -> np.ndarray:
-    """
-    Simple square-neighborhood inflation (keeps your original behavior).
+    kernel="circle" uses a disk of radius k cells instead (corners of the
+    square are not inflated).
 
     Args:
         binary_occ: uint8 occupancy (0/1).
         radius_m: inflation radius in meters.
         res: meters per cell.
+        kernel: "square" or "circle".
 
     Returns:
         float32 costmap where inflated cells are 1.0, free are 0.0.
@@ -50,62 +73,419 @@ def _inflate(binary_occ: np.ndarray, radius_m: float, res: float) -> np.ndarray:
         return binary_occ.astype(np.float32)
 
     k = max(1, int(round(radius_m / res)))
-    H, W = binary_occ.shape
-    out = np.zeros_like(binary_occ, dtype=np.uint8)
-
-    for y in range(H):
-        y0 = max(0, y - k)
-        y1 = min(H, y + k + 1)
-        row = out[y]
-        for x in range(W):
-            x0 = max(0, x - k)
-            x1 = min(W, x + k + 1)
-            if binary_occ[y0:y1, x0:x1].any():
-                row[x] = 1
+    occ = np.asarray(binary_occ) != 0
+
+    if kernel == "square":
+        out = _dilate_axis(_dilate_axis(occ, k, axis=1), k, axis=0)
+    elif kernel == "circle":
+        H, W = occ.shape
+        out = occ.copy()
+        for dy, dx in _disk_offsets(k):
+            if abs(dy) >= H or abs(dx) >= W:
+                continue
+            ys, yd = slice(max(0, -dy), H - max(0, dy)), slice(max(0, dy), H - max(0, -dy))
+            xs, xd = slice(max(0, -dx), W - max(0, dx)), slice(max(0, dx), W - max(0, -dx))
+            out[yd, xd] |= occ[ys, xs]
+    else:
+        raise ValueError(f"unknown inflation kernel: {kernel!r}")
 
     return out.astype(np.float32)
 
 
 # ============================================================================
-# Mapping (unchanged behavior)
+# Mapping
 # ============================================================================
 
-def update_memory_with_latest(robot_name: str) -> None:
+def _scan_points(robot_name: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    This robot's latest points from both S300 sensors: (N, 2) local (x, y),
+    (N, 2) local mount of the sensor that saw each point (SENSOR_MOUNTS),
+    and (N,) measured ranges (the packets' dist column).
+    """
+    points, mounts, ranges = [], [], []
+    for sensor, sig in zip(SCAN_SENSORS, scan_signals(robot_name)):
+        pts = shared.latest_data.get(sig)
+        if pts is None or len(pts) == 0:
+            continue
+        arr = np.asarray(pts, dtype=np.float64)
+        arr = arr.reshape(len(arr), -1)
+        points.append(arr[:, :2])
+        ranges.append(arr[:, 3])
+        mount = np.asarray(SENSOR_MOUNTS.get(sensor, (0.0, 0.0)), dtype=np.float64)
+        mounts.append(np.broadcast_to(mount, (len(arr), 2)))
+    if not points:
+        empty = np.empty((0, 2), dtype=np.float64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+    return np.concatenate(points), np.concatenate(mounts), np.concatenate(ranges)
+
+
+def _local_to_world(points: np.ndarray, pose) -> np.ndarray:
+    """Rotate local (x, y) points by yaw and translate by the robot position."""
+    (rx, ry), yaw = pose
+    c, s = np.cos(yaw), np.sin(yaw)
+    wx = rx + c * points[:, 0] - s * points[:, 1]
+    wy = ry + s * points[:, 0] + c * points[:, 1]
+    return np.column_stack((wx, wy))
+
+
+def _world_cells(world_xy: np.ndarray, res: float) -> tuple[np.ndarray, np.ndarray]:
+    """Integer world cells (wx, wy) of world points (nearest cell; cell (0, 0) holds (0, 0))."""
+    wx = np.rint(world_xy[:, 0] / res).astype(np.int64)
+    wy = np.rint(world_xy[:, 1] / res).astype(np.int64)
+    return wx, wy
+
+
+def stamp_points(world_xy: np.ndarray, res: float) -> int:
+    """
+    Mark the world cell of every (x, y) point occupied (1), with log-odds
+    LOGODDS_MAX like a loaded hit, through shared.write_map_cells in one
+    batch. The caller holds shared.MAP_LOCK.
+
+    Returns:
+        The number of occupancy cells that changed.
+    """
+    if len(world_xy) == 0:
+        return 0
+    wx, wy = _world_cells(world_xy, res)
+    cells = np.unique(np.column_stack((wx, wy)), axis=0)
+    return shared.write_map_cells(cells[:, 0], cells[:, 1], 1, shared.LOGODDS_MAX)
+
+
+def trace_rays(shape, origins: np.ndarray, ends: np.ndarray, stop_short: np.ndarray | None = None) -> np.ndarray:
+    """
+    Flat indices (y * W + x) of the in-bounds cells each ray passes through,
+    from its origin cell up to but not including its end cell (DDA: one
+    sample per cell along the major axis). All rays are traced in one batch.
+
+    Args:
+        shape: (H, W) of the grid.
+        origins: (N, 2) integer (gx, gy) ray origins.
+        ends: (N, 2) integer (gx, gy) ray end cells.
+        stop_short: optional (N,) bool; those rays also leave out the cell
+            just before their end.
     """
-    Stamp all latest points for this robot into the CURRENT global occupancy.
+    H, W = shape
+    d = ends - origins
+    n = np.abs(d).max(axis=1)
+    count = n if stop_short is None else n - stop_short.astype(n.dtype)
+    keep = count > 0
+    origins, d, n, count = origins[keep], d[keep], n[keep], count[keep]
+    if n.size == 0:
+        return np.empty(0, dtype=np.intp)
+
+    ray = np.repeat(np.arange(n.size), count)
+    k = np.arange(ray.size) - np.repeat(np.cumsum(count) - count, count)
+    t = k / n[ray]
+    # round half up: the same cells wherever the batch's box puts the origin
+    xs = np.floor(origins[ray, 0] + d[ray, 0] * t + 0.5).astype(np.intp)
+    ys = np.floor(origins[ray, 1] + d[ray, 1] * t + 0.5).astype(np.intp)
+    inside = (xs >= 0) & (xs < W) & (ys >= 0) & (ys < H)
+    return ys[inside] * W + xs[inside]
+
+
+def integrate_scans(origins_xy: np.ndarray, world_xy: np.ndarray, ranges: np.ndarray | None = None) -> int:
+    """
+    Update the log-odds layer of shared.map_tiles with one batch of rays and
+    threshold the touched cells into occupancy (shared.write_map_cells; the
+    caller holds shared.MAP_LOCK).
+
+    Cells a ray passes through get LOGODDS_MISS (once per batch), end cells
+    get LOGODDS_HIT, both clamped. A ray that hits leaves out the cell just
+    before its end: rays grazing a wall cross the wall's edge cells there,
+    and misses on them would erode the wall. Returns the number of occupancy
+    cells that flipped.
+
+    Args:
+        origins_xy: (N, 2) sensor origin per point (world meters).
+        world_xy: (N, 2) points (world meters).
+        ranges: optional (N,) ranges measured from the sensor; returns at or
+            beyond SENSOR_MAX_RANGE_M clear free space only (no hit).
+    """
+    res = shared.MAP_RESOLUTION
+    if len(world_xy) == 0:
+        return 0
+
+    if ranges is None:
+        ranges = np.hypot(*(world_xy - origins_xy).T)
+    max_r = float(getattr(shared, "SENSOR_MAX_RANGE_M", np.inf))
+    is_hit = ranges < max_r
+    far = ~is_hit
+    if far.any():
+        # clip no-return rays to the max range
+        v = world_xy[far] - origins_xy[far]
+        world_xy = world_xy.copy()
+        world_xy[far] = origins_xy[far] + v * (max_r / np.maximum(ranges[far], 1e-9))[:, None]
+
+    ox, oy = _world_cells(origins_xy, res)
+    ex, ey = _world_cells(world_xy, res)
+    # trace inside the batch's bounding box; dedupe through cell masks there
+    # (cheaper than np.unique on many ray samples)
+    x0, y0 = min(ox.min(), ex.min()), min(oy.min(), ey.min())
+    W = int(max(ox.max(), ex.max()) - x0 + 1)
+    H = int(max(oy.max(), ey.max()) - y0 + 1)
+    free_mask = np.zeros(H * W, dtype=bool)
+    free_mask[trace_rays((H, W), np.column_stack((ox - x0, oy - y0)), np.column_stack((ex - x0, ey - y0)), is_hit)] = True
+    hit_mask = np.zeros(H * W, dtype=bool)
+    hit_mask[(ey[is_hit] - y0) * W + (ex[is_hit] - x0)] = True
+    free_mask &= ~hit_mask
+    touched = np.concatenate((np.flatnonzero(free_mask), np.flatnonzero(hit_mask)))
+    n_free = touched.size - int(hit_mask.sum())
+    ys, xs = np.divmod(touched, W)
+    wx, wy = xs + x0, ys + y0
+
+    lo = shared.map_tiles["logodds"].get_cells(wx, wy)
+    lo[:n_free] = np.maximum(lo[:n_free] + shared.LOGODDS_MISS, shared.LOGODDS_MIN)
+    lo[n_free:] = np.minimum(lo[n_free:] + shared.LOGODDS_HIT, shared.LOGODDS_MAX)
+    return shared.write_map_cells(wx, wy, (lo > shared.LOGODDS_OCCUPIED).astype(np.uint8), lo)
+
+
+def update_memory_with_fleet(robot_names=None) -> None:
+    """
+    Fuse the latest points of several robots (default: all known robots)
+    into the map (shared.map_tiles and its planning view) in one batch. Each robot's scans are
+    moved to the world frame with its position and yaw
+    (shared.robot_orientation[...][2]).
+
+    With shared.MAP_LOGODDS the rays from each sensor's mount to its hits
+    also clear free space through the log-odds layer (ranges from the
+    packets); otherwise hits are only stamped.
+    Changed cells mark the costmap dirty and are appended to the map journal
+    (shared.write_map_cells).
     Respects shared.FREEZE_MAP (no-op if True).
     """
     if getattr(shared, "FREEZE_MAP", False):
         return
 
-    rx, ry = shared.robot_positions.get(robot_name, (0.0, 0.0))
-    for sig in (f"{robot_name}_S300_combined_data", f"{robot_name}_S3001_combined_data"):
-        for (lx, ly, _lz, _dist) in shared.latest_data.get(sig, []):
-            wx, wy = rx + lx, ry + ly
-            _stamp_hit(shared.global_occupancy, wx, wy, shared.MAP_RESOLUTION)
+    if robot_names is None:
+        robot_names = list(shared.robot_positions)
+    world, origins, ranges = [], [], []
+    for name in robot_names:
+        local, mounts, dist = _scan_points(name)
+        if len(local) == 0:
+            continue
+        pose = (shared.robot_positions.get(name, (0.0, 0.0)), shared.robot_orientation.get(name, (0.0, 0.0, 0.0))[2])
+        world.append(_local_to_world(local, pose))
+        origins.append(_local_to_world(mounts, pose))
+        ranges.append(dist)
+    if not world:
+        return
+
+    world_xy = np.concatenate(world)
+    with shared.MAP_LOCK:
+        if getattr(shared, "MAP_LOGODDS", False):
+            integrate_scans(np.concatenate(origins), world_xy, np.concatenate(ranges))
+        else:
+            stamp_points(world_xy, shared.MAP_RESOLUTION)
+
+
+def update_memory_with_latest(robot_name: str) -> None:
+    """
+    Stamp all latest points for this robot into the map.
+    Respects shared.FREEZE_MAP (no-op if True).
+    """
+    update_memory_with_fleet([robot_name])
+
+
+# Inflation radius the current global_costmap was built with (None = never built)
+_costmap_radius_m = None
 
 
 def rebuild_costmap(inflation_radius_m: float = shared.INFLATION_RADIUS_M) -> None:
     """
-    Rebuild the global costmap by inflating occupancy.
+    Bring the global costmap up to date with occupancy.
     Thickness is controlled by inflation_radius_m (meters).
+
+    Only shared.map_dirty_bbox grown by the inflation radius is re-inflated
+    (from occupancy grown by twice the radius, so window edges are exact).
+    A different radius or map shape than last time rebuilds everything; a
+    clean map is a no-op.
     """
     if inflation_radius_m is None:
         inflation_radius_m = getattr(shared, "COST_INFLATION_RADIUS_M", 0.10)
-
-    cm = _inflate(shared.global_occupancy, inflation_radius_m, shared.MAP_RESOLUTION)
-    shared.global_costmap[:] = cm
+    with shared.MAP_LOCK:
+        _update_costmap(inflation_radius_m)
     shared.maybe_autosave(every_n_updates=25)
 
 
+def _update_costmap(inflation_radius_m: float) -> None:
+    """rebuild_costmap's work; the caller holds shared.MAP_LOCK."""
+    global _costmap_radius_m
+    occ, cm = shared.global_occupancy, shared.global_costmap
+    full = (
+        _costmap_radius_m != inflation_radius_m
+        or cm.shape != occ.shape
+    )
+    bbox = shared.map_dirty_bbox
+    if not full and bbox is None:
+        return
+
+    if full:
+        cm[:] = _inflate(occ, inflation_radius_m, shared.MAP_RESOLUTION)
+    else:
+        H, W = occ.shape
+        k = max(1, int(round(inflation_radius_m / shared.MAP_RESOLUTION))) if inflation_radius_m > 0 else 0
+        y0, y1, x0, x1 = bbox
+        # costmap cells that can change, and the occupancy they depend on
+        oy0, oy1, ox0, ox1 = max(0, y0 - k), min(H, y1 + k), max(0, x0 - k), min(W, x1 + k)
+        iy0, iy1, ix0, ix1 = max(0, y0 - 2 * k), min(H, y1 + 2 * k), max(0, x0 - 2 * k), min(W, x1 + 2 * k)
+        patch = _inflate(occ[iy0:iy1, ix0:ix1], inflation_radius_m, shared.MAP_RESOLUTION)
+        cm[oy0:oy1, ox0:ox1] = patch[oy0 - iy0:oy1 - iy0, ox0 - ix0:ox1 - ix0]
+
+    _costmap_radius_m = inflation_radius_m
+    shared.map_dirty_bbox = None
+
+
+# ============================================================================
+# Multi-resolution pyramid
+# ============================================================================
+
+PYRAMID_FACTORS = (2, 4, 8)  # 0.4 / 0.8 / 1.6 m levels at 0.2 m cells
+
+
+def max_pool(costmap: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Max-pool `costmap` by `factor` (a coarse cell is as costly as its worst
+    fine cell). Edges are padded with 0, so partial border cells keep only
+    what is inside the map.
+    """
+    H, W = costmap.shape
+    Hc, Wc = -(-H // factor), -(-W // factor)
+    padded = np.zeros((Hc * factor, Wc * factor), dtype=costmap.dtype)
+    padded[:H, :W] = costmap
+    return padded.reshape(Hc, factor, Wc, factor).max(axis=(1, 3))
+
+
+def build_pyramid(costmap: np.ndarray, factors=PYRAMID_FACTORS) -> dict[int, np.ndarray]:
+    """{factor: max-pooled costmap} for each factor (1 = costmap itself)."""
+    levels = {1: costmap}
+    prev, prev_f = costmap, 1
+    for f in sorted(factors):
+        # pool from the previous level when it divides evenly (max of maxes)
+        step = f // prev_f if f % prev_f == 0 else None
+        levels[f] = max_pool(prev, step) if step else max_pool(costmap, f)
+        if step:
+            prev, prev_f = levels[f], f
+    for arr in levels.values():
+        if arr is not costmap:
+            arr.setflags(write=False)
+    return levels
+
+
 # ============================================================================
-# Optional: simple planning view (no clearing)
+# Planning view: versioned read-only snapshots
 # ============================================================================
 
+class MapView:
+    """
+    Read-only planning view of the map at one shared.map_version.
+
+    occupancy (uint8) and costmap (float32, inflated with inflation_radius_m)
+    are private copies with the write flag cleared, shared by every reader of
+    this version; clearance() fields and the pyramid() levels are computed
+    once per view. Readers that
+    hold a view across awaits take a reference (`with view:` or
+    acquire()/release()) so it stays registered until they are done.
+    """
+
+    def __init__(self, version: int, occupancy: np.ndarray, costmap: np.ndarray, res: float, inflation_radius_m: float):
+        self.version = version
+        self.occupancy = occupancy
+        self.costmap = costmap
+        self.res = res
+        self.inflation_radius_m = inflation_radius_m
+        self.refs = 0
+        self._clearance: dict[tuple[int, float], np.ndarray] = {}
+        self._pyramid = None
+        self._lock = threading.Lock()
+        for arr in (occupancy, costmap):
+            arr.setflags(write=False)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.costmap.shape
+
+    def clearance(self, k: int, block_threshold: float = 0.99) -> np.ndarray:
+        """Chebyshev clearance (capped at k+1) of costmap cells >= block_threshold."""
+        key = (int(k), float(block_threshold))
+        with self._lock:
+            field = self._clearance.get(key)
+            if field is None:
+                field = chebyshev_clearance(self.costmap >= block_threshold, int(k))
+                self._clearance[key] = field
+        return field
+
+    def pyramid(self) -> dict[int, np.ndarray]:
+        """Max-pooled costmap levels {factor: grid}, built once per view."""
+        with self._lock:
+            if self._pyramid is None:
+                self._pyramid = build_pyramid(self.costmap)
+        return self._pyramid
+
+    def acquire(self) -> "MapView":
+        with _VIEWS_LOCK:
+            self.refs += 1
+        return self
+
+    def release(self) -> None:
+        with _VIEWS_LOCK:
+            self.refs -= 1
+            _prune_views()
+
+    def __enter__(self) -> "MapView":
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+# (version, radius, shape) -> view; the current view per radius plus
+# superseded ones that still have readers
+_VIEWS: dict[tuple, MapView] = {}
+_VIEWS_LOCK = threading.Lock()
+
+
+def _prune_views() -> None:
+    """Drop superseded views nobody holds (caller holds _VIEWS_LOCK)."""
+    for key, view in list(_VIEWS.items()):
+        if view.refs <= 0 and view.version != shared.map_version:
+            del _VIEWS[key]
+
+
+def planning_snapshot(inflation_radius_m: float = shared.INFLATION_RADIUS_M) -> MapView:
+    """
+    Read-only view of the current map inflated with `inflation_radius_m`.
+    Every caller gets the same MapView until the map changes (no copies);
+    the first call after a change brings the incrementally maintained
+    global_costmap up to date and copies it and occupancy under
+    shared.MAP_LOCK. Only a radius other than the global costmap's is
+    inflated from scratch.
+    """
+    with shared.MAP_LOCK:
+        key = (shared.map_version, inflation_radius_m, shared.global_occupancy.shape)
+        with _VIEWS_LOCK:
+            view = _VIEWS.get(key)
+            if view is not None:
+                return view
+        occ = shared.global_occupancy.astype(np.uint8, copy=True)
+        cm = None
+        if _costmap_radius_m in (None, inflation_radius_m):
+            _update_costmap(inflation_radius_m)
+            cm = shared.global_costmap.copy()
+
+    if cm is None:
+        cm = _inflate(occ, inflation_radius_m, shared.MAP_RESOLUTION)
+    view = MapView(key[0], occ, cm, shared.MAP_RESOLUTION, inflation_radius_m)
+    with _VIEWS_LOCK:
+        view = _VIEWS.setdefault(key, view)
+        _prune_views()
+    return view
+
+
 def get_planning_costmap(inflation_radius_m: float) -> np.ndarray:
     """
-    Returns a *copy* of the current costmap built with the given inflation.
-    Does NOT clear robot footprints; does NOT mutate the globals.
+    Returns the current costmap built with the given inflation, as a
+    read-only array shared by all readers of this map version
+    (planning_snapshot(...).costmap). Does NOT clear robot footprints;
+    does NOT mutate the globals.
     """
-    occ = shared.global_occupancy.astype(np.uint8, copy=True)
-    return _inflate(occ, inflation_radius_m, shared.MAP_RESOLUTION)
+    return planning_snapshot(inflation_radius_m).costmap
@@ -0,0 +1,111 @@
+# sim_app/map_journal.py
+"""
+Append-only journal of occupancy changes (write-ahead log for map_memory.npz).
+
+- Each record is one changed cell: map version, world cell (fixed origin, see
+  tile_map.py), old/new occupancy and the log-odds value after the change.
+- append() writes and flushes only the new records, so persisting a tick
+  costs what changed, not the map size.
+- compact(version) drops records already contained in a base snapshot saved
+  at `version`; read(after) returns the records to replay on top of a base.
+- Records may lie outside a base snapshot's centered window (older
+  snapshots held only the planning view); compact(version, window) keeps
+  those, since the base lacks them.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+
+RECORD_DTYPE = np.dtype([
+    ("version", "<u8"),
+    ("wx", "<i4"),
+    ("wy", "<i4"),
+    ("old", "u1"),
+    ("new", "u1"),
+    ("logodds", "<f4"),
+])
+
+
+class MapJournal:
+    """
+    Args:
+        path: journal file (created on first append).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = None
+        self.records = 0
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            self.records = size // RECORD_DTYPE.itemsize
+            if size % RECORD_DTYPE.itemsize:
+                # torn last record after a crash: cut it so appends stay aligned
+                with open(path, "r+b") as f:
+                    f.truncate(self.records * RECORD_DTYPE.itemsize)
+
+    def append(self, version: int, wx, wy, old, new, logodds) -> None:
+        """Append one record per changed cell (all with the same map version)."""
+        rec = np.empty(len(wx), dtype=RECORD_DTYPE)
+        if rec.size == 0:
+            return
+        rec["version"] = version
+        rec["wx"], rec["wy"] = wx, wy
+        rec["old"], rec["new"] = old, new
+        rec["logodds"] = logodds
+        with self._lock:
+            if self._f is None:
+                self._f = open(self.path, "ab")
+            self._f.write(rec.tobytes())
+            self._f.flush()
+            self.records += rec.size
+
+    def _read_locked(self, after_version: int) -> np.ndarray:
+        if self._f is not None:
+            self._f.flush()
+        if not os.path.exists(self.path):
+            return np.empty(0, dtype=RECORD_DTYPE)
+        raw = np.fromfile(self.path, dtype=np.uint8)
+        usable = raw.size - raw.size % RECORD_DTYPE.itemsize
+        rec = raw[:usable].view(RECORD_DTYPE)
+        return rec[rec["version"] > after_version]
+
+    def read(self, after_version: int = -1) -> np.ndarray:
+        """Records with version > after_version, in write order."""
+        with self._lock:
+            return self._read_locked(after_version)
+
+    def compact(self, version: int, window: tuple[int, int] | None = None) -> int:
+        """
+        Drop records with version <= `version` (they are in the base snapshot).
+        With `window` (H, W) of the snapshot's centered dense grid, older
+        records of cells outside it are kept. Returns records kept.
+        """
+        with self._lock:
+            keep = self._read_locked(-1)
+            drop = keep["version"] <= version
+            if window is not None:
+                H, W = window
+                drop &= (
+                    (keep["wx"] >= -(W // 2)) & (keep["wx"] < W - W // 2)
+                    & (keep["wy"] >= -(H // 2)) & (keep["wy"] < H - H // 2)
+                )
+            keep = keep[~drop]
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+            tmp = f"{self.path}.tmp{os.getpid()}"
+            keep.tofile(tmp)
+            os.replace(tmp, self.path)
+            self.records = int(keep.size)
+        return self.records
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
@@ -0,0 +1,101 @@
+# sim_app/map_saver.py
+"""
+Background map persistence.
+
+- BackgroundSaver: one daemon worker thread that writes snapshots handed to
+  request(). The caller only pays for the snapshot copy; compression and disk
+  I/O happen on the worker, off the asyncio control loop.
+- Requests coalesce: while a write is in progress, newer requests for the same
+  path replace each other, so a burst of autosaves costs at most one extra write.
+- write_npz_atomic: compress to a temporary file next to the target and
+  os.replace() it in, so readers never see a half-written map.
+"""
+
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+
+def write_npz_atomic(path: str, arrays: dict) -> None:
+    """np.savez_compressed `arrays` to `path` via a temp file + os.replace."""
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class BackgroundSaver:
+    """
+    Args:
+        write: callable(path, snapshot) doing the actual write (worker thread).
+    """
+
+    def __init__(self, write=write_npz_atomic):
+        self._write = write
+        self._pending: dict[str, dict] = {}   # path -> newest snapshot
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self.saves = 0        # completed writes
+        self.coalesced = 0    # requests replaced by a newer one before writing
+        self.last_error = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="map-saver", daemon=True)
+            self._thread.start()
+
+    def request(self, path: str, snapshot: dict) -> None:
+        """Queue `snapshot` for `path`, replacing any not-yet-written one."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BackgroundSaver is closed")
+            if path in self._pending:
+                self.coalesced += 1
+            self._pending[path] = snapshot
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                path, snapshot = self._pending.popitem()
+                self._busy = True
+            try:
+                self._write(path, snapshot)
+                self.saves += 1
+            except Exception as e:
+                self.last_error = e
+                print(f"⚠️ Background map save failed ({path}): {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every queued snapshot is written. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Flush, then stop the worker thread."""
+        ok = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return ok
@@ -14,7 +14,8 @@ import math
 import os
 
 import sim_app.shared as shared
-from sim_app.astar_env import meters_to_grid
+from sim_app.sensor_fetch import iter_points, scan_signals
+from sim_app.tile_map import reference_cell
 
 
 # ============================================================================
@@ -64,9 +65,7 @@ _OCCUPIED_CELLS = _load_occupied_grids()
 
 def _obstacle_in_occupied_file(px: float, py: float) -> bool:
     """Return True if world (px, py) maps to a grid present in occupied_grids.txt."""
-    g = shared.global_occupancy
-    res = shared.MAP_RESOLUTION
-    gx, gy = meters_to_grid(px, py, g, res)
+    gx, gy = reference_cell(px, py, shared.MAP_RESOLUTION)
     return (gx, gy) in _OCCUPIED_CELLS
 
 
@@ -76,9 +75,8 @@ def _obstacle_in_occupied_file(px: float, py: float) -> bool:
 
 def _iter_points(robot_name):
     """Iterate latest fused sensor points for this robot."""
-    for sig in (f"{robot_name}_S300_combined_data", f"{robot_name}_S3001_combined_data"):
-        for p in shared.latest_data.get(sig, []):
-            yield p
+    for sig in scan_signals(robot_name):
+        yield from iter_points(sig)
 
 
 def _direction8_of_point(p):
@@ -209,7 +207,7 @@ def check_sensors_for_obstacle(dx, dy, robot_name):
         # 2) static-ignore check from occupied_grids.txt
         if _obstacle_in_occupied_file(px, py):
             # optional debug:
-            # print(f"ℹ️ Ignoring obstacle @grid {meters_to_grid(px, py, shared.global_occupancy, shared.MAP_RESOLUTION)} dir={d8}")
+            # print(f"ℹ️ Ignoring obstacle @grid {reference_cell(px, py, shared.MAP_RESOLUTION)} dir={d8}")
             continue
 
         # 3) finally mark as seen only if not ignored
@@ -13,12 +13,13 @@ from sim_app.astar_env import meters_to_grid
 from sim_app.map_builder import rebuild_costmap, update_memory_with_latest
 from sim_app.obstacle_awareness import check_sensors_for_obstacle, is_path_clear
 from sim_app.robot_controller import OmniRobotController
-from sim_app.robot_motion import RobotMotion
+from sim_app.robot_motion import WHEEL_RADIUS, RobotMotion
 from sim_app.robots_awareness import (
     request_robot_to_clear,
     return_parked_robot_after_active_done,
 )
-from sim_app.sensor_fetch import fetch_sensor_data
+from sim_app.sensor_fetch import fetch_fleet_frame
+from sim_app.sensor_poller import poller_for
 
 
 # ============================================================================
@@ -29,6 +30,9 @@ goal_error_threshold = 0.1
 speed = 100 * math.pi / 180
 MAP_RES = shared.MAP_RESOLUTION
 
+# Time to drive one cell; a repeated waypoint (planned wait) holds this long
+WAIT_STEP_S = MAP_RES / (speed * WHEEL_RADIUS)
+
 CMD_FILE = "shared_cmd.json"     # same as LLM.py
 GOAL_FILE = "shared_goal.json"   # LLM may set a new goal here
 
@@ -80,7 +84,20 @@ class PathExecutor:
 
     async def follow_path(self, path):
         shared.planned_path = path
+        # a space-time plan that waits before moving off repeats the start;
+        # wait those steps here, since the head (path[:2]) is skipped below
+        k = 1
+        while k < len(path) and tuple(path[k]) == tuple(path[0]):
+            await asyncio.sleep(WAIT_STEP_S)
+            k += 1
+        path = path[k - 1:]
+        previous = path[1] if len(path) > 1 else None
         for waypoint in path[2:]:
+            if previous is not None and tuple(waypoint) == tuple(previous):
+                # space-time plan asked us to wait one step here
+                await asyncio.sleep(WAIT_STEP_S)
+                continue
+            previous = waypoint
             await self.reset_orientation()
             while True:
                 result = await self.move_to_goal(waypoint)
@@ -117,28 +134,37 @@ class PathExecutor:
         dx = 0 if abs(dx) < goal_error_threshold else dx
         dy = 0 if abs(dy) < goal_error_threshold else dy
 
-        # sensor + optional map refresh
-        await fetch_sensor_data(self.sim, f"{Robot}_S300_combined_data")
-        await fetch_sensor_data(self.sim, f"{Robot}_S3001_combined_data")
-        shared.robot_orientation[Robot] = await self.get_orientation()
-        shared.robot_positions[Robot] = await self.get_position()
+        # sensor refresh; polled scans are mapped once per main-loop tick
+        # (main.map_fresh_scans), so only a robot without a poller maps here
+        poller = poller_for(Robot)
+        if poller is None:
+            # (scans, orientation and position requested together: one round trip)
+            _frame, orientation, position = await asyncio.gather(
+                fetch_fleet_frame(self.sim, [Robot]), self.get_orientation(), self.get_position()
+            )
+        else:
+            orientation, position = await asyncio.gather(self.get_orientation(), self.get_position())
+        shared.robot_orientation[Robot] = orientation
+        shared.robot_positions[Robot] = position
 
-        if not shared.FREEZE_MAP:
+        if not shared.FREEZE_MAP and poller is None:
             update_memory_with_latest(Robot)
             rebuild_costmap(inflation_radius_m=shared.INFLATION_RADIUS_M)
             shared.maybe_autosave(every_n_updates=25)
 
-        grid_now = getattr(shared, "costmap", None)  # if you keep an inflated costmap
-        if grid_now is None:
-            grid_now = shared.global_occupancy  # fallback to raw occupancy
-        self.plan_grid = grid_now
-
-        # still block if the target cell itself is hard-blocked in the planning grid
-        way_g = meters_to_grid(waypoint[0], waypoint[1], self.plan_grid, MAP_RES)
-        wy = min(max(way_g[1], 0), self.plan_grid.shape[0] - 1)
-        wx = min(max(way_g[0], 0), self.plan_grid.shape[1] - 1)
-        # treat any non-free (>0) as blocked if you're using an inflated costmap
-        if float(self.plan_grid[wy, wx]) >= 0.99:
+        # still block if the target cell itself is hard-blocked; one cell is
+        # read under MAP_LOCK (a map write or resize never tears it)
+        with shared.MAP_LOCK:
+            grid_now = getattr(shared, "costmap", None)  # if you keep an inflated costmap
+            if grid_now is None:
+                grid_now = shared.global_occupancy  # fallback to raw occupancy
+            self.plan_grid = grid_now
+            way_g = meters_to_grid(waypoint[0], waypoint[1], self.plan_grid, MAP_RES)
+            wy = min(max(way_g[1], 0), self.plan_grid.shape[0] - 1)
+            wx = min(max(way_g[0], 0), self.plan_grid.shape[1] - 1)
+            # treat any non-free (>0) as blocked if you're using an inflated costmap
+            target_blocked = float(self.plan_grid[wy, wx]) >= 0.99
+        if target_blocked:
             return "replanned"
 
         # reached waypoint?
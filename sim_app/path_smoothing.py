@@ -0,0 +1,93 @@
+# sim_app/path_smoothing.py
+"""
+Waypoint reduction for A* cell paths.
+
+The omni base only drives fixed Horizontal / Vertical / 45° Diagonal wheel
+patterns (robot_motion.py), so PathExecutor reaches a far waypoint by going
+diagonally until one axis is aligned and then straight. A shortcut between two
+path cells is therefore checked along exactly that octile route, not along the
+Euclidean segment.
+
+- octile_cells: cells visited when driving diagonal-then-straight from a to b.
+- smooth_path: greedy string pulling that keeps a waypoint only where the
+  octile route would hit a blocked cell or get closer to obstacles than the
+  original path did.
+"""
+
+import numpy as np
+
+
+def octile_cells(a, b) -> tuple[np.ndarray, np.ndarray]:
+    """(xs, ys) of the cells from a to b: diagonal leg first, then straight leg."""
+    (x0, y0), (x1, y1) = a, b
+    dx, dy = x1 - x0, y1 - y0
+    sx, sy = int(np.sign(dx)), int(np.sign(dy))
+    n_diag = min(abs(dx), abs(dy))
+    n_straight = max(abs(dx), abs(dy)) - n_diag
+
+    k = np.arange(1, n_diag + 1)
+    xs, ys = x0 + sx * k, y0 + sy * k
+    cx, cy = x0 + sx * n_diag, y0 + sy * n_diag
+    k = np.arange(1, n_straight + 1)
+    if abs(dx) > abs(dy):
+        xs = np.concatenate([xs, cx + sx * k])
+        ys = np.concatenate([ys, np.full(n_straight, cy)])
+    else:
+        xs = np.concatenate([xs, np.full(n_straight, cx)])
+        ys = np.concatenate([ys, cy + sy * k])
+    return xs, ys
+
+
+def _route_ok(env, a, b, need_clearance: int) -> bool:
+    xs, ys = octile_cells(a, b)
+    if env._blocked[ys, xs].any():
+        return False
+    if need_clearance > 0 and env.clearance is not None:
+        return bool((env.clearance[ys, xs] >= need_clearance).all())
+    return True
+
+
+def smooth_path(path, env, min_clearance: int = 2, keep_head: int = 2):
+    """
+    Collapse a cell path into few waypoints the robot can drive between directly.
+
+    Args:
+        path: list of (cx, cy) cells from A* (start first).
+        env: AStarEnvironment the path was planned on (blocked mask + clearance).
+        min_clearance: clearance (Chebyshev cells) a shortcut must keep; where
+            the original path ran closer to obstacles, its own clearance is the
+            requirement instead, so shortcuts never get nearer than it was.
+        keep_head: leading cells kept verbatim. PathExecutor skips path[:2] and
+            drives from path[0] straight to the next waypoint, so the first
+            shortcut is checked from path[0].
+
+    Returns:
+        A sub-list of `path` with the same start and goal.
+    """
+    if len(path) <= keep_head + 1:
+        return list(path)
+
+    head = max(1, keep_head)
+    out = list(path[:head])
+    clear = env.clearance
+    i = head - 1
+    n = len(path)
+    while i < n - 1:
+        origin = path[0] if i == head - 1 else path[i]
+        j = i + 1
+        need = min_clearance
+        if clear is not None:
+            need = min(need, int(clear[path[j][1], path[j][0]]))
+        # extend the shortcut while the octile route stays as safe as the path
+        while j + 1 < n:
+            nxt = path[j + 1]
+            need_next = need
+            if clear is not None:
+                need_next = min(need, int(clear[nxt[1], nxt[0]]))
+            if not _route_ok(env, origin, nxt, need_next):
+                break
+            j += 1
+            need = need_next
+        out.append(path[j])
+        i = j
+    return out
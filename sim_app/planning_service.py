@@ -0,0 +1,170 @@
+# sim_app/planning_service.py
+"""
+Process-pool planning service.
+
+- The planning grid is published once per map content into a
+  multiprocessing.shared_memory block; workers attach to it by name instead of
+  receiving a pickled copy with every request.
+- Searches run in worker processes, so concurrent robot plans are not
+  serialized by the GIL and do not stall the asyncio supervisor loop.
+- PlanningService.plan() is awaitable and returns the same cell path
+  (list of (cx, cy)) as AStar / GridAStar, or None.
+- `broken` tells a dead pool (a worker crashed) from a failing request;
+  shutdown(wait=False) retires a dead pool without blocking the event loop.
+"""
+
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+
+# ============================================================================
+# Worker side
+# ============================================================================
+
+# shm name -> (SharedMemory, ndarray view); one attachment per worker process
+_ATTACHED: dict = {}
+_ATTACHED_MAX = 4
+
+
+def _attach(name: str, shape, dtype) -> np.ndarray:
+    hit = _ATTACHED.get(name)
+    if hit is not None:
+        return hit[1]
+    shm = shared_memory.SharedMemory(name=name)
+    arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    arr.setflags(write=False)
+    _ATTACHED[name] = (shm, arr)
+    while len(_ATTACHED) > _ATTACHED_MAX:
+        old = next(iter(_ATTACHED))
+        old_shm, _old_arr = _ATTACHED.pop(old)
+        del _old_arr
+        old_shm.close()
+    return arr
+
+
+def _worker_plan(shm_name, shape, dtype, start_grid, goal_grid, res, env_kwargs, engine):
+    """Run one search in a worker process on the shared grid."""
+    from sim_app.astar import AStar, GridAStar
+    from sim_app.astar_env import AStarEnvironment
+
+    grid = _attach(shm_name, shape, dtype)
+    env = AStarEnvironment(grid, start_grid, goal_grid, res, **env_kwargs)
+    search = GridAStar if engine == "array" else AStar
+    path = search(env).search("robot")
+    return [(int(x), int(y)) for (x, y) in path] if path else None
+
+
+# ============================================================================
+# Parent side
+# ============================================================================
+
+class PlanningService:
+    """
+    Awaitable planner backed by a process pool.
+
+    Args:
+        max_workers: worker processes (one per robot is a good default).
+        keep_grids: published grids kept alive (older ones are unlinked once
+            no request is using them).
+    """
+
+    def __init__(self, max_workers: int = 3, keep_grids: int = 2):
+        # spawn: same behavior on Windows and Linux, no forked sim/asyncio state
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context("spawn"))
+        self._keep = max(1, int(keep_grids))
+        self._grids: dict[bytes, dict] = {}   # digest -> {"shm", "shape", "dtype", "users"}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.broken = False   # set once a request failed with BrokenProcessPool
+
+    def _publish(self, grid: np.ndarray) -> bytes:
+        """Copy `grid` into shared memory unless identical content is already published."""
+        grid = np.ascontiguousarray(grid)
+        digest = hashlib.blake2b(grid.tobytes(), digest_size=16).digest()
+        digest += str((grid.shape, grid.dtype.str)).encode()
+        with self._lock:
+            entry = self._grids.get(digest)
+            if entry is None:
+                shm = shared_memory.SharedMemory(create=True, size=max(1, grid.nbytes))
+                np.ndarray(grid.shape, dtype=grid.dtype, buffer=shm.buf)[...] = grid
+                entry = {"shm": shm, "shape": grid.shape, "dtype": grid.dtype.str, "users": 0}
+                self._grids[digest] = entry
+            else:
+                # most recently used last
+                self._grids[digest] = self._grids.pop(digest)
+            entry["users"] += 1
+            self._evict()
+        return digest
+
+    def _release(self, digest: bytes) -> None:
+        with self._lock:
+            entry = self._grids.get(digest)
+            if entry is not None:
+                entry["users"] -= 1
+            self._evict()
+
+    def _evict(self) -> None:
+        """Unlink least recently used grids beyond `keep_grids` that nobody is using."""
+        keep = 0 if self._closed else self._keep
+        for digest in list(self._grids):
+            if len(self._grids) <= keep:
+                break
+            entry = self._grids[digest]
+            if entry["users"] > 0:
+                continue
+            del self._grids[digest]
+            entry["shm"].close()
+            entry["shm"].unlink()
+
+    async def plan(self, grid, start_grid, goal_grid, res, env_kwargs, engine: str = "array"):
+        """Plan on `grid` in a worker process; returns a list of cells or None."""
+        digest = self._publish(grid)
+        entry = self._grids[digest]
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool,
+                _worker_plan,
+                entry["shm"].name,
+                entry["shape"],
+                entry["dtype"],
+                tuple(int(v) for v in start_grid),
+                tuple(int(v) for v in goal_grid),
+                float(res),
+                dict(env_kwargs),
+                engine,
+            )
+        except BrokenProcessPool:
+            self.broken = True
+            raise
+        finally:
+            self._release(digest)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the workers and unlink the published grids.
+
+        wait=True (exit): cancel queued requests and join the workers.
+        wait=False (replacing a broken pool from the event loop): return at
+        once, leave in-flight requests alone; grids still in use are unlinked
+        when their last request releases them.
+        """
+        if not wait:
+            self._pool.shutdown(wait=False)
+            with self._lock:
+                self._closed = True
+                self._evict()
+            return
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._closed = True
+            for entry in self._grids.values():
+                entry["shm"].close()
+                entry["shm"].unlink()
+            self._grids.clear()
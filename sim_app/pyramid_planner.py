@@ -0,0 +1,75 @@
+# sim_app/pyramid_planner.py
+"""
+Coarse-to-fine planning on the max-pooled costmap pyramid.
+
+- The route is first searched on a coarse level (map_builder.build_pyramid;
+  a coarse cell is blocked if any of its fine cells is).
+- The coarse path, widened by a few coarse cells, becomes a corridor, and the
+  full-resolution search (GridAStar with the planner's usual costs) runs only
+  inside it.
+- Max-pooling closes aisles narrower than a coarse cell, so a level that finds
+  no route (or whose corridor holds no fine route) falls through to the next
+  finer level; returning False leaves the full-grid search to the caller.
+"""
+
+import numpy as np
+
+from sim_app.astar import GridAStar
+from sim_app.astar_env import AStarEnvironment
+from sim_app.map_builder import _dilate_axis
+
+
+def _coarse_path(coarse: np.ndarray, start, goal, factor: int, env):
+    """A* on one pyramid level; start/goal coarse cells are always enterable."""
+    sc = (start[0] // factor, start[1] // factor)
+    gc = (goal[0] // factor, goal[1] // factor)
+    grid = np.array(coarse, dtype=np.float32)
+    grid[sc[1], sc[0]] = 0.0
+    grid[gc[1], gc[0]] = 0.0
+    cenv = AStarEnvironment(grid, sc, gc, env.res * factor, block_threshold=env.block_threshold)
+    return GridAStar(cenv, report=False).search("robot")
+
+
+def corridor_mask(coarse_path, factor: int, shape, margin_cells: int = 1) -> np.ndarray:
+    """Fine-resolution bool mask of the coarse path grown by `margin_cells` coarse cells."""
+    H, W = shape
+    Hc, Wc = -(-H // factor), -(-W // factor)
+    mask = np.zeros((Hc, Wc), dtype=bool)
+    xs, ys = zip(*coarse_path)
+    mask[list(ys), list(xs)] = True
+    if margin_cells > 0:
+        mask = _dilate_axis(_dilate_axis(mask, margin_cells, axis=1), margin_cells, axis=0)
+    return np.repeat(np.repeat(mask, factor, axis=0), factor, axis=1)[:H, :W]
+
+
+def plan_coarse_to_fine(env, pyramid: dict, factors=(4, 2), margin_cells: int = 2):
+    """
+    Plan env's "robot" start → goal coarse-to-fine.
+
+    Args:
+        env: full-resolution AStarEnvironment (its costs are used for the fine search).
+        pyramid: {factor: max-pooled costmap} from map_builder.build_pyramid /
+            MapView.pyramid() for env's grid.
+        factors: coarse levels to try, coarsest first.
+        margin_cells: corridor half-width around the coarse path, in coarse cells.
+
+    Returns:
+        List of fine cells, or False if no level produced a route.
+    """
+    start = env.agent_dict["robot"]["start"]
+    goal = env.agent_dict["robot"]["goal"]
+    for factor in factors:
+        coarse = pyramid.get(factor)
+        if coarse is None:
+            continue
+        cpath = _coarse_path(coarse, start, goal, factor, env)
+        if not cpath:
+            print(f"🔍 coarse x{factor}: no route, trying a finer level.")
+            continue
+        allowed = corridor_mask(cpath, factor, (env.H, env.W), margin_cells)
+        path = GridAStar(env, allowed=allowed).search("robot")
+        if path:
+            print(f"🔍 coarse x{factor}: {len(cpath)} coarse cells, corridor {int(allowed.sum())} cells.")
+            return path
+        print(f"🔍 coarse x{factor}: corridor has no fine route, trying a finer level.")
+    return False
@@ -0,0 +1,117 @@
+# sim_app/reservation.py
+"""
+Space-time reservation table for prioritized multi-robot planning.
+
+- ReservationTable: which robot holds which cell at which planner step
+  (one step = one cell move). Paths are reserved with a footprint radius and
+  a little time slack, and a robot's final cell stays reserved after arrival.
+- build_reservations: fills a table from the clean plans of the other busy
+  robots (shared.planned_path_by_robot), starting at each robot's current
+  progress along its plan.
+
+Used by astar.SpaceTimeAStar so new plans route around robots that are
+already moving instead of meeting them and negotiating a parking move;
+ReservationTable.conflicts tells whether a normal plan needs that at all.
+"""
+
+import math
+
+from sim_app import shared
+from sim_app.astar_env import meters_to_grid
+from sim_app.path_smoothing import octile_cells
+
+
+class ReservationTable:
+    """
+    Args:
+        footprint_cells: Chebyshev radius reserved around each path cell.
+        time_slack: steps reserved before/after the nominal time at a cell.
+    """
+
+    def __init__(self, footprint_cells: int = 2, time_slack: int = 1):
+        self.footprint = int(footprint_cells)
+        self.slack = int(time_slack)
+        self.cells: dict[tuple[int, int, int], str] = {}   # (x, y, t) -> robot
+        self.parked: dict[tuple[int, int], tuple[int, str]] = {}  # (x, y) -> (from t, robot)
+        self.horizon = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.cells or self.parked)
+
+    def _footprint(self, x: int, y: int):
+        r = self.footprint
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                yield x + dx, y + dy
+
+    def reserve_path(self, robot: str, cells) -> None:
+        """Reserve `cells` (dense, one per step from t=0) and park on the last one."""
+        if not cells:
+            return
+        for t, (x, y) in enumerate(cells):
+            for cx, cy in self._footprint(x, y):
+                for tt in range(max(0, t - self.slack), t + self.slack + 1):
+                    self.cells.setdefault((cx, cy, tt), robot)
+        t_end = len(cells) - 1
+        gx, gy = cells[-1]
+        for cx, cy in self._footprint(gx, gy):
+            prev = self.parked.get((cx, cy))
+            if prev is None or t_end < prev[0]:
+                self.parked[(cx, cy)] = (t_end, robot)
+        self.horizon = max(self.horizon, t_end + self.slack + 1)
+
+    def is_reserved(self, x: int, y: int, t: int) -> bool:
+        """True if another robot holds (x, y) at step t."""
+        if (x, y, t) in self.cells:
+            return True
+        park = self.parked.get((x, y))
+        return park is not None and t >= park[0]
+
+    def last_reserved(self, x: int, y: int) -> float:
+        """Last step at which (x, y) is held (inf if a robot parks there)."""
+        if (x, y) in self.parked:
+            return math.inf
+        last = -1
+        for t in range(self.horizon + 1):
+            if (x, y, t) in self.cells:
+                last = t
+        return last
+
+    def conflicts(self, cells) -> bool:
+        """True if a dense path driven from t=0 enters a reserved cell or ends on a parked one."""
+        for t, (x, y) in enumerate(cells):
+            if self.is_reserved(x, y, min(t, self.horizon)):
+                return True
+        return bool(cells) and tuple(cells[-1]) in self.parked
+
+
+def densify(cells) -> list[tuple[int, int]]:
+    """Expand sparse waypoints into one cell per step along the driven octile route."""
+    if not cells:
+        return []
+    out = [tuple(cells[0])]
+    for a, b in zip(cells, cells[1:]):
+        if tuple(a) == tuple(b):
+            out.append(tuple(b))   # a planned wait keeps the cell for a step
+            continue
+        xs, ys = octile_cells(a, b)
+        out.extend(zip(xs.tolist(), ys.tolist()))
+    return out
+
+
+def build_reservations(robot_name, grid, res, footprint_cells: int = 2, time_slack: int = 1):
+    """
+    Reservation table for every busy robot other than `robot_name`.
+
+    Each plan is densified, trimmed to the robot's current progress (nearest
+    cell to shared.robot_positions) and reserved from t=0.
+    """
+    table = ReservationTable(footprint_cells=footprint_cells, time_slack=time_slack)
+    for rid, path_m in shared.planned_path_by_robot.items():
+        if rid == robot_name or not path_m or shared.robot_status.get(rid) != "busy":
+            continue
+        dense = densify([meters_to_grid(x, y, grid, res) for (x, y) in path_m])
+        px, py = meters_to_grid(*shared.robot_positions.get(rid, path_m[0]), grid, res)
+        k = min(range(len(dense)), key=lambda i: max(abs(dense[i][0] - px), abs(dense[i][1] - py)))
+        table.reserve_path(rid, dense[k:])
+    return table
@@ -20,8 +20,9 @@ from sim_app.obstacle_awareness import (
     is_path_clear,                 # kept as-is (may be used elsewhere)
     check_sensors_for_obstacle,
 )
-from sim_app.sensor_fetch import fetch_sensor_data
-from sim_app.astar_env import meters_to_grid  # for grid check
+from sim_app.sensor_fetch import fetch_fleet_frame
+from sim_app.sensor_poller import poller_for
+from sim_app.tile_map import reference_cell  # for grid check (free_grids.txt frame)
 
 
 # -----------------------------------------------------------------------------
@@ -69,10 +70,8 @@ _FREE_GRIDS = _load_free_grids()
 
 
 def _candidate_is_in_free_file(xm: float, ym: float) -> bool:
-    """Convert meters → grid and check membership in the free_grids set."""
-    g = shared.global_occupancy
-    res = shared.MAP_RESOLUTION
-    gx, gy = meters_to_grid(xm, ym, g, res)
+    """Convert meters → grid (free_grids.txt frame) and check membership in the free_grids set."""
+    gx, gy = reference_cell(xm, ym, shared.MAP_RESOLUTION)
     ok = (gx, gy) in _FREE_GRIDS
     if not ok:
         print(f"🚫 candidate ({xm:.3f}, {ym:.3f}) → grid ({gx},{gy}) NOT in free_grids.txt")
@@ -347,10 +346,9 @@ async def request_robot_to_clear(sim, toward_goal, active_robot, blocking_robot,
             print(f"dx={dx}, dy={dy}, vx={vx}, vy={vy}")
 
             # Refresh both robots' sensors so clearance decisions stay current
-            await fetch_sensor_data(sim, f"{active_robot}_S300_combined_data")
-            await fetch_sensor_data(sim, f"{active_robot}_S3001_combined_data")
-            await fetch_sensor_data(sim, f"{blocking_robot}_S300_combined_data")
-            await fetch_sensor_data(sim, f"{blocking_robot}_S3001_combined_data")
+            # (running sensor pollers already keep both robots' scans current)
+            if not (poller_for(active_robot) and poller_for(blocking_robot)):
+                await fetch_fleet_frame(sim, [active_robot, blocking_robot])
 
             await asyncio.sleep(0.05)
 
@@ -0,0 +1,188 @@
+# sim_app/scan_history.py
+"""
+Bounded per-signal scan history (backs shared.all_sensor_data).
+
+- ScanRing: a preallocated (max_points, 4) float32 ring of (x, y, z, dist)
+  points plus per-scan metadata (timestamp, offset, count). Appending a scan is
+  one array copy; every scan is stored contiguously (a scan that would straddle
+  the end of the buffer starts again at offset 0), so any scan is a view.
+- Scans leave the ring when their space is reused, when there are more than
+  max_scans of them, or when they are older than window_s.
+- Optional spill: evicted scans are appended to a raw float32 file that
+  spilled() exposes as a read-only np.memmap.
+- Views returned by scans()/points() alias the ring: they stay valid until the
+  ring wraps over them; copy what must be kept longer.
+"""
+
+import os
+import time
+from array import array
+
+import numpy as np
+
+_POINT_BYTES = 16  # (x, y, z, dist) float32
+
+
+class ScanRing:
+    """
+    Args:
+        max_points: point capacity of the ring (one scan never exceeds it).
+        max_scans: scan capacity (metadata slots).
+        window_s: drop scans older than this many seconds (None = no limit).
+        spill_path: raw float32 file evicted scans are appended to (None = drop).
+    """
+
+    def __init__(self, max_points: int = 200_000, max_scans: int = 512,
+                 window_s: float | None = 60.0, spill_path: str | None = None):
+        self.max_points = int(max_points)
+        self.max_scans = int(max_scans)
+        self.window_s = window_s
+        self.spill_path = spill_path
+        self._pts = None                     # allocated on first append
+        self._t = np.zeros(self.max_scans, dtype=np.float64)
+        self._off = np.zeros(self.max_scans, dtype=np.int64)
+        self._cnt = np.zeros(self.max_scans, dtype=np.int64)
+        self._head = 0      # slot of the oldest scan
+        self._scans = 0     # scans held
+        self._write = 0     # next point offset
+        self._points = 0    # points held
+        self.appended = 0   # scans appended in total
+        # spill index: per spilled scan (timestamp, first point, count)
+        self._spill_t = array("d")
+        self._spill_off = array("q")
+        self._spill_cnt = array("q")
+        self._spill_f = None
+        self._spill_points = 0
+
+    # ------------------------------------------------------------------ #
+    # Writing
+    # ------------------------------------------------------------------ #
+
+    def _evict_oldest(self) -> None:
+        slot = self._head
+        off, cnt = int(self._off[slot]), int(self._cnt[slot])
+        if self.spill_path is not None:
+            self._spill(float(self._t[slot]), self._pts[off:off + cnt])
+        self._head = (self._head + 1) % self.max_scans
+        self._scans -= 1
+        self._points -= cnt
+
+    def _overlaps_oldest(self, start: int, end: int) -> bool:
+        off = int(self._off[self._head])
+        return start <= off < end
+
+    def append(self, pts, t: float | None = None) -> None:
+        """Store one scan (an (N, 4) array or sequence of (x, y, z, dist))."""
+        pts = np.asarray(pts, dtype=np.float32).reshape(-1, 4)
+        n = len(pts)
+        if n == 0:
+            return
+        if n > self.max_points:
+            pts, n = pts[-self.max_points:], self.max_points
+        if self._pts is None:
+            self._pts = np.empty((self.max_points, 4), dtype=np.float32)
+        t = time.monotonic() if t is None else float(t)
+
+        if self.window_s is not None:
+            while self._scans and self._t[self._head] < t - self.window_s:
+                self._evict_oldest()
+        start = self._write
+        if start + n > self.max_points:
+            # wrap: scans left in the skipped tail are the oldest ones
+            while self._scans and int(self._off[self._head]) >= start:
+                self._evict_oldest()
+            start = 0
+        while self._scans and (self._scans >= self.max_scans or self._overlaps_oldest(start, start + n)):
+            self._evict_oldest()
+
+        self._pts[start:start + n] = pts
+        slot = (self._head + self._scans) % self.max_scans
+        self._t[slot], self._off[slot], self._cnt[slot] = t, start, n
+        self._scans += 1
+        self._points += n
+        self._write = start + n
+        self.appended += 1
+
+    def extend(self, pts) -> None:
+        """list.extend-compatible alias: the points form one scan."""
+        self.append(pts)
+
+    def clear(self) -> None:
+        self._head = self._scans = self._write = self._points = 0
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+
+    def __len__(self) -> int:
+        """Points held in the ring (list-compatible)."""
+        return self._points
+
+    def __iter__(self):
+        """(x, y, z, dist) tuples, oldest first (compatibility; prefer scans())."""
+        for _t, view in self.scans():
+            yield from map(tuple, view.tolist())
+
+    @property
+    def scan_count(self) -> int:
+        return self._scans
+
+    def _slots(self, n: int | None):
+        k = self._scans if n is None else max(0, min(int(n), self._scans))
+        for i in range(self._scans - k, self._scans):
+            slot = (self._head + i) % self.max_scans
+            yield float(self._t[slot]), int(self._off[slot]), int(self._cnt[slot])
+
+    def scans(self, n: int | None = None) -> list[tuple[float, np.ndarray]]:
+        """(timestamp, (N, 4) view) of the last `n` scans (all if None), oldest first."""
+        return [(t, self._pts[off:off + cnt]) for t, off, cnt in self._slots(n)]
+
+    def points(self, n: int | None = None) -> np.ndarray:
+        """
+        Points of the last `n` scans as one (M, 4) array: a view when they are
+        contiguous in the ring, a concatenated copy when they wrap.
+        """
+        slots = list(self._slots(n))
+        if not slots:
+            return np.empty((0, 4), dtype=np.float32)
+        start = end = slots[0][1]
+        for _t, off, cnt in slots:
+            if off != end:
+                return np.concatenate([self._pts[o:o + c] for _t, o, c in slots])
+            end = off + cnt
+        return self._pts[start:end]
+
+    # ------------------------------------------------------------------ #
+    # Spill
+    # ------------------------------------------------------------------ #
+
+    def _spill(self, t: float, view: np.ndarray) -> None:
+        if self._spill_f is None:
+            self._spill_f = open(self.spill_path, "ab")
+            self._spill_points = os.path.getsize(self.spill_path) // _POINT_BYTES
+        self._spill_f.write(np.ascontiguousarray(view, dtype="<f4").tobytes())
+        self._spill_t.append(t)
+        self._spill_off.append(self._spill_points)
+        self._spill_cnt.append(len(view))
+        self._spill_points += len(view)
+
+    def spilled(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (points, index) of the scans spilled this run: points is a read-only
+        (M, 4) memmap, index an (S, 3) array of (timestamp, first point, count).
+        """
+        index = np.column_stack((
+            np.frombuffer(self._spill_t, dtype=np.float64),
+            np.frombuffer(self._spill_off, dtype=np.int64),
+            np.frombuffer(self._spill_cnt, dtype=np.int64),
+        )) if self._spill_t else np.empty((0, 3))
+        if self._spill_f is None or self._spill_points == 0:
+            return np.empty((0, 4), dtype=np.float32), index
+        self._spill_f.flush()
+        mm = np.memmap(self.spill_path, dtype="<f4", mode="r", shape=(self._spill_points, 4))
+        return mm, index
+
+    def close(self) -> None:
+        if self._spill_f is not None:
+            self._spill_f.close()
+            self._spill_f = None
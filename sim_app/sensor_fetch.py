@@ -4,15 +4,93 @@ Utilities to fetch and decode sensor packets from CoppeliaSim string signals.
 
 - Signals are ASCII Base64 strings containing little-endian float32 sequences.
 - Supports payloads of (x, y, z, dist) or (x, y, z) per point.
-- Populates `latest_data` and appends to `all_sensor_data`.
+- Decodes straight into an (N, 4) float32 array (x, y, z, dist): a read-only
+  view of the decoded bytes for the 4-float format, one vectorized pass that
+  derives dist for the 3-float format.
+- Populates `latest_data` (arrays) and appends each scan to its
+  `all_sensor_data` ring (scan_history.ScanRing).
+- iter_points() yields plain (x, y, z, dist) tuples for per-point callers.
+- Decoded scans are also handed to sensor_log (no-op unless recording).
+- fetch_fleet_frame() reads the scan signals of several robots concurrently
+  (the async ZMQ client opens one socket per in-flight call), so a tick costs
+  about one round trip instead of one per signal.
 """
 
+import asyncio
 import base64
-import struct
-from math import sqrt
 
+import numpy as np
+
+from sim_app.sensor_log import record_scan
 from sim_app.shared import all_sensor_data, latest_data
 
+SCAN_SENSORS = ("S300", "S3001")
+
+# Mount (x, y) of each scanner in the robot-local laser_frame, in meters. The
+# Omnirob carries its S300s on opposite corners; the mapper traces each ray
+# from its sensor's mount, so set these to match the robot model in use.
+SENSOR_MOUNTS = {"S300": (0.53, 0.29), "S3001": (-0.53, -0.29)}
+
+_EMPTY = np.empty((0, 4), dtype=np.float32)
+_EMPTY.setflags(write=False)
+
+
+def scan_signals(robot_name: str) -> list[str]:
+    """String signals carrying `robot_name`'s fused laser scans."""
+    return [f"{robot_name}_{sensor}_combined_data" for sensor in SCAN_SENSORS]
+
+
+def decode_points(raw: bytes) -> np.ndarray | None:
+    """
+    Decode raw little-endian float32 bytes into an (N, 4) array of (x, y, z, dist).
+
+    Returns None if the float count fits neither format.
+    """
+    floats = np.frombuffer(raw, dtype="<f4", count=len(raw) // 4)
+    n = floats.size
+    if n % 4 == 0:
+        # Format: (x, y, z, dist) — zero-copy view
+        return floats.reshape(-1, 4)
+    if n % 3 == 0:
+        # Format: (x, y, z) — derive dist
+        xyz = floats.reshape(-1, 3)
+        pts = np.empty((len(xyz), 4), dtype=np.float32)
+        pts[:, :3] = xyz
+        np.hypot(xyz[:, 0], xyz[:, 1], out=pts[:, 3])
+        return pts
+    return None
+
+
+def iter_points(signal_name: str):
+    """Iterate the latest points of `signal_name` as (x, y, z, dist) float tuples."""
+    pts = latest_data.get(signal_name)
+    if pts is None or len(pts) == 0:
+        return iter(())
+    return map(tuple, np.asarray(pts).tolist())
+
+
+def store_packet(signal_name: str, b64) -> int:
+    """
+    Decode one Base64 packet of `signal_name` into `latest_data` and its
+    `all_sensor_data` ring. Returns the number of decoded points.
+    """
+    pts = None
+    if b64:
+        if isinstance(b64, str):
+            b64 = b64.encode("ascii")
+
+        # Back to raw binary bytes
+        raw = base64.b64decode(b64)
+        pts = decode_points(raw) if len(raw) >= 4 else None
+    if pts is None or len(pts) == 0:
+        pts = _EMPTY
+
+    latest_data[signal_name] = pts
+    record_scan(signal_name, pts)
+    if len(pts):
+        all_sensor_data[signal_name].append(pts)
+    return len(pts)
+
 
 async def fetch_sensor_data(sim, signal_name: str) -> int:
     """
@@ -27,39 +105,22 @@ async def fetch_sensor_data(sim, signal_name: str) -> int:
     """
     # ASCII Base64 text from the sim
     b64 = await sim.getStringSignal(signal_name)
-    if not b64:
-        latest_data[signal_name] = []
-        return 0
-
-    if isinstance(b64, str):
-        b64 = b64.encode("ascii")
-
-    # Back to raw binary bytes
-    raw = base64.b64decode(b64)
+    return store_packet(signal_name, b64)
 
-    n = len(raw) // 4
-    if n == 0:
-        latest_data[signal_name] = []
-        return 0
 
-    # Little-endian float32
-    floats = struct.unpack("<" + "f" * n, raw)
+async def fetch_fleet_frame(sim, robot_names) -> dict[str, dict[str, np.ndarray]]:
+    """
+    Fetch every scan signal of `robot_names` in one concurrent batch.
 
-    pts = []
-    if n % 4 == 0:
-        # Format: (x, y, z, dist)
-        for i in range(0, len(floats), 4):
-            x, y, z, dist = floats[i : i + 4]
-            pts.append((x, y, z, dist))
-    elif n % 3 == 0:
-        # Format: (x, y, z) — derive dist
-        for i in range(0, len(floats), 3):
-            x, y, z = floats[i : i + 3]
-            pts.append((x, y, z, sqrt(x * x + y * y)))
-    else:
-        latest_data[signal_name] = []
-        return 0
+    Args:
+        sim: CoppeliaSim remote API object (calls on it may overlap).
+        robot_names: robots to read.
 
-    latest_data[signal_name] = pts
-    all_sensor_data[signal_name].extend(pts)
-    return len(pts)
+    Returns:
+        dict: {robot: {signal: (N, 4) points}} for this tick (also stored in
+        `latest_data` / `all_sensor_data` like fetch_sensor_data does).
+    """
+    robots = list(dict.fromkeys(robot_names))
+    signals = [sig for robot in robots for sig in scan_signals(robot)]
+    await asyncio.gather(*(fetch_sensor_data(sim, sig) for sig in signals))
+    return {robot: {sig: latest_data[sig] for sig in scan_signals(robot)} for robot in robots}
@@ -0,0 +1,329 @@
+# sim_app/sensor_log.py
+"""
+Sensor recording and deterministic replay.
+
+- SensorRecorder: while recording, every packet stored by
+  sensor_fetch.store_packet is buffered, and tick() writes one frame: the
+  scans that arrived since the previous tick plus every robot's pose
+  (shared.robot_positions / robot_orientation, as published from the
+  controllers). All appends, no rewrites of earlier data.
+- Files of a log `<base>`:
+    <base>.pts     float32 (x, y, z, dist) points of all scans, back to back
+    <base>.scans   SCAN_DTYPE per scan: signal id, first point, point count
+    <base>.poses   POSE_DTYPE per robot per frame: robot id, x, y, orientation
+    <base>.frames  FRAME_DTYPE per frame: timestamp, scan range, pose range
+    <base>.json    signal / robot name tables
+- SensorReplay memory-maps the files and feeds frames back into
+  shared.latest_data / robot_positions / robot_orientation, frame by frame or
+  paced at recorded speed (or a multiple of it), so mapping and obstacle
+  checks can be profiled without the simulator:
+
+    python -m sim_app.sensor_log runs/shift1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+
+import numpy as np
+
+from sim_app import shared
+
+SCAN_DTYPE = np.dtype([("signal", "<u2"), ("offset", "<u8"), ("count", "<u4")])
+POSE_DTYPE = np.dtype([("robot", "<u2"), ("x", "<f4"), ("y", "<f4"), ("ori", "<f4", (3,))])
+FRAME_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("scan0", "<u8"), ("nscans", "<u4"),
+    ("pose0", "<u8"), ("nposes", "<u4"),
+])
+_FILES = ("pts", "scans", "poses", "frames")
+
+
+class SensorRecorder:
+    """
+    Args:
+        base: path prefix of the log files (existing files are appended to;
+            the new frames' timestamps continue after the last recorded one).
+    """
+
+    def __init__(self, base: str):
+        self.base = base
+        os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        meta = _read_meta(base)
+        self.signals: dict[str, int] = {n: i for i, n in enumerate(meta["signals"])}
+        self.robots: dict[str, int] = {n: i for i, n in enumerate(meta["robots"])}
+        self._truncate_torn_tail()
+        self._f = {k: open(f"{base}.{k}", "ab") for k in _FILES}
+        self._pending: list[tuple[str, np.ndarray]] = []
+        self._t0 = time.monotonic()   # this session's clock, offset by _t_base
+
+    def _truncate_torn_tail(self) -> None:
+        """
+        Cut the files back to the last complete frame, so appends after a
+        crash stay aligned: .frames to whole records, .scans / .poses / .pts
+        to the extent that frame references.
+        """
+        base = self.base
+        self.frames = _count(f"{base}.frames", FRAME_DTYPE.itemsize)
+        self._scans = self._poses = self._points = 0
+        self._t_base = 0.0
+        if self.frames:
+            last = np.fromfile(f"{base}.frames", dtype=FRAME_DTYPE,
+                               count=1, offset=(self.frames - 1) * FRAME_DTYPE.itemsize)[0]
+            self._scans = int(last["scan0"]) + int(last["nscans"])
+            self._poses = int(last["pose0"]) + int(last["nposes"])
+            self._t_base = float(last["t"])
+            if self._scans:
+                rec = np.fromfile(f"{base}.scans", dtype=SCAN_DTYPE,
+                                  count=1, offset=(self._scans - 1) * SCAN_DTYPE.itemsize)[0]
+                self._points = int(rec["offset"]) + int(rec["count"])
+        for ext, n, itemsize in (
+            ("frames", self.frames, FRAME_DTYPE.itemsize),
+            ("scans", self._scans, SCAN_DTYPE.itemsize),
+            ("poses", self._poses, POSE_DTYPE.itemsize),
+            ("pts", self._points, 16),
+        ):
+            path = f"{base}.{ext}"
+            if os.path.exists(path) and os.path.getsize(path) != n * itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(n * itemsize)
+
+    def _id(self, table: dict, name: str) -> int:
+        if name not in table:
+            table[name] = len(table)
+            self._write_meta()
+        return table[name]
+
+    def _write_meta(self) -> None:
+        tmp = f"{self.base}.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "signals": list(self.signals), "robots": list(self.robots)}, f)
+        os.replace(tmp, f"{self.base}.json")
+
+    def add_scan(self, signal_name: str, pts: np.ndarray) -> None:
+        """Buffer one decoded scan for the next frame."""
+        self._pending.append((signal_name, pts))
+
+    def tick(self, t: float | None = None) -> int:
+        """
+        Write one frame (pending scans + current poses). `t` is seconds into
+        this session (default: since the recorder opened). Returns the frame number.
+        """
+        t = self._t_base + (time.monotonic() - self._t0 if t is None else float(t))
+        pending, self._pending = self._pending, []
+
+        scans = np.empty(len(pending), dtype=SCAN_DTYPE)
+        for i, (sig, pts) in enumerate(pending):
+            pts = np.ascontiguousarray(pts, dtype="<f4").reshape(-1, 4)
+            self._f["pts"].write(pts.tobytes())
+            scans[i] = (self._id(self.signals, sig), self._points, len(pts))
+            self._points += len(pts)
+
+        robots = list(shared.robot_positions)
+        poses = np.zeros(len(robots), dtype=POSE_DTYPE)
+        for i, name in enumerate(robots):
+            x, y = shared.robot_positions[name][:2]
+            ori = shared.robot_orientation.get(name, (0.0, 0.0, 0.0))
+            poses[i] = (self._id(self.robots, name), x, y, tuple(ori[:3]))
+
+        frame = np.array([(t, self._scans, len(scans), self._poses, len(poses))], dtype=FRAME_DTYPE)
+        self._f["scans"].write(scans.tobytes())
+        self._f["poses"].write(poses.tobytes())
+        self._f["frames"].write(frame.tobytes())
+        for f in self._f.values():
+            f.flush()
+        self._scans += len(scans)
+        self._poses += len(poses)
+        self.frames += 1
+        return self.frames - 1
+
+    def close(self) -> None:
+        for f in self._f.values():
+            f.close()
+
+
+def _count(path: str, itemsize: int) -> int:
+    return os.path.getsize(path) // itemsize if os.path.exists(path) else 0
+
+
+def _read_meta(base: str) -> dict:
+    path = f"{base}.json"
+    if not os.path.exists(path):
+        return {"version": 1, "signals": [], "robots": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _memmap(path: str, dtype, shape_tail=()) -> np.ndarray:
+    n = _count(path, np.dtype(dtype).itemsize * int(np.prod(shape_tail or (1,))))
+    if n == 0:
+        return np.empty((0, *shape_tail), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(n, *shape_tail))
+
+
+# ============================================================================
+# Recording hooks (sensor_fetch.store_packet, main loop)
+# ============================================================================
+
+_RECORDER: SensorRecorder | None = None
+
+
+def start_recording(base: str) -> SensorRecorder:
+    global _RECORDER
+    _RECORDER = SensorRecorder(base)
+    print(f"⏺️ Recording sensors to: {base}.* (frame {_RECORDER.frames})")
+    return _RECORDER
+
+
+def record_scan(signal_name: str, pts: np.ndarray) -> None:
+    if _RECORDER is not None:
+        _RECORDER.add_scan(signal_name, pts)
+
+
+def record_tick() -> None:
+    if _RECORDER is not None:
+        _RECORDER.tick()
+
+
+def stop_recording() -> None:
+    global _RECORDER
+    if _RECORDER is not None:
+        _RECORDER.tick()
+        _RECORDER.close()
+        print(f"⏹️ Recorded {_RECORDER.frames} frames to: {_RECORDER.base}.*")
+        _RECORDER = None
+
+
+# ============================================================================
+# Replay
+# ============================================================================
+
+class SensorReplay:
+    """
+    Args:
+        base: path prefix of a log written by SensorRecorder.
+    """
+
+    def __init__(self, base: str):
+        meta = _read_meta(base)
+        self.signals = meta["signals"]
+        self.robots = meta["robots"]
+        self.pts = _memmap(f"{base}.pts", "<f4", (4,))
+        self.scans = _memmap(f"{base}.scans", SCAN_DTYPE)
+        self.poses = _memmap(f"{base}.poses", POSE_DTYPE)
+        self.frames = _memmap(f"{base}.frames", FRAME_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def frame(self, i: int):
+        """
+        (t, [(signal, (N, 4) view), ...], {robot: ((x, y), (a, b, g))}) of frame i;
+        scans in arrival order (a signal may appear more than once per frame).
+        """
+        fr = self.frames[i]
+        s0, p0 = int(fr["scan0"]), int(fr["pose0"])
+        scans = []
+        for rec in self.scans[s0:s0 + int(fr["nscans"])]:
+            off, n = int(rec["offset"]), int(rec["count"])
+            scans.append((self.signals[rec["signal"]], self.pts[off:off + n]))
+        poses = {
+            self.robots[rec["robot"]]: ((float(rec["x"]), float(rec["y"])), tuple(rec["ori"].tolist()))
+            for rec in self.poses[p0:p0 + int(fr["nposes"])]
+        }
+        return float(fr["t"]), scans, poses
+
+    def apply(self, i: int) -> list:
+        """Load frame i into shared state like the live fetches would. Returns its scans."""
+        _t, scans, poses = self.frame(i)
+        for sig, pts in scans:
+            shared.latest_data[sig] = pts
+            if len(pts):
+                shared.all_sensor_data[sig].append(pts)
+        for name, (pos, ori) in poses.items():
+            shared.robot_positions[name] = pos
+            shared.robot_orientation[name] = ori
+        return scans
+
+    def __iter__(self):
+        """Apply frames in order, as fast as possible; yields frame numbers."""
+        for i in range(len(self)):
+            self.apply(i)
+            yield i
+
+    async def play(self, speed: float = 1.0, on_frame=None) -> None:
+        """
+        Apply every frame, paced at `speed` x recorded time (speed <= 0: no
+        pacing). `on_frame(i)` (sync or async) runs after each frame.
+        """
+        if len(self) == 0:
+            return
+        t_rec0 = float(self.frames[0]["t"])
+        t_wall0 = time.monotonic()
+        for i in range(len(self)):
+            if speed > 0:
+                due = t_wall0 + (float(self.frames[i]["t"]) - t_rec0) / speed
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+            self.apply(i)
+            if on_frame is not None:
+                res = on_frame(i)
+                if asyncio.iscoroutine(res):
+                    await res
+
+
+# ============================================================================
+# Offline profiling
+# ============================================================================
+
+@contextlib.contextmanager
+def _live_mapping_in_memory():
+    """Live mapping on, with the map journal and map saves switched off."""
+    saved = (shared.FREEZE_MAP, shared.MAP_PERSIST)
+    shared.FREEZE_MAP, shared.MAP_PERSIST = False, False
+    try:
+        yield
+    finally:
+        shared.FREEZE_MAP, shared.MAP_PERSIST = saved
+
+
+def profile_replay(base: str, mapping: bool = True) -> dict:
+    """Replay a log at full speed, timing obstacle checks (and mapping) per frame."""
+    from sim_app.map_builder import rebuild_costmap, update_memory_with_fleet
+    from sim_app.obstacle_awareness import check_sensors_for_obstacle
+
+    replay = SensorReplay(base)
+    obstacle_s, mapping_s = [], []
+    with _live_mapping_in_memory() if mapping else contextlib.nullcontext():
+        for _i in replay:
+            t0 = time.perf_counter()
+            for robot in replay.robots:
+                check_sensors_for_obstacle(0.0, 0.0, robot)
+            obstacle_s.append(time.perf_counter() - t0)
+            if mapping:
+                t0 = time.perf_counter()
+                update_memory_with_fleet(replay.robots)
+                rebuild_costmap(inflation_radius_m=shared.INFLATION_RADIUS_M)
+                mapping_s.append(time.perf_counter() - t0)
+
+    def ms(values):
+        if not values:
+            return {}
+        arr = np.asarray(values) * 1000.0
+        return {"p50": float(np.percentile(arr, 50)), "p99": float(np.percentile(arr, 99)), "mean": float(arr.mean())}
+
+    return {"frames": len(replay), "obstacle_ms": ms(obstacle_s), "mapping_ms": ms(mapping_s)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay a sensor log and profile obstacle checks / mapping.")
+    ap.add_argument("base", help="log path prefix (without extension)")
+    ap.add_argument("--no-mapping", action="store_true", help="only time check_sensors_for_obstacle")
+    args = ap.parse_args()
+    print(json.dumps(profile_replay(args.base, mapping=not args.no_mapping), indent=2))
+
+
+if __name__ == "__main__":
+    main()
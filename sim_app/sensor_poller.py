@@ -0,0 +1,164 @@
+# sim_app/sensor_poller.py
+"""
+Background scan polling with a latest-frame cache.
+
+- SensorPoller: one asyncio task per robot reading its scan signals
+  (sensor_fetch.scan_signals) at a fixed rate, all signals of a poll in one
+  concurrent batch.
+- A payload whose digest matches the previous one for that signal is skipped
+  without decoding; a poll where any signal changed publishes a new ScanFrame
+  with the next sequence number.
+- Consumers read latest() without waiting, or await wait_newer(seq) for the
+  first frame newer than one they already handled. A frame carries no pose:
+  consumers pairing it with a pose they read should check frame.age().
+- start_pollers / stop_pollers / poller_for manage the per-robot pollers.
+"""
+
+import asyncio
+import hashlib
+import time
+
+from sim_app.sensor_fetch import scan_signals, store_packet
+from sim_app.shared import latest_data
+
+POLL_RATE_HZ = 20.0
+
+
+class ScanFrame:
+    """One published poll: sequence number, monotonic timestamp, {signal: (N, 4) points}."""
+
+    __slots__ = ("seq", "t", "scans")
+
+    def __init__(self, seq: int, t: float, scans: dict):
+        self.seq = seq
+        self.t = t
+        self.scans = scans
+
+    def age(self) -> float:
+        """Seconds since the frame was published."""
+        return time.monotonic() - self.t
+
+
+class SensorPoller:
+    """
+    Args:
+        sim: CoppeliaSim remote API object.
+        robot_name: robot whose scan signals are polled.
+        rate_hz: polls per second.
+    """
+
+    def __init__(self, sim, robot_name: str, rate_hz: float = POLL_RATE_HZ):
+        self.sim = sim
+        self.robot = robot_name
+        self.signals = scan_signals(robot_name)
+        self.period = 1.0 / rate_hz
+        self._digests: dict[str, bytes] = {}
+        self._frame = ScanFrame(0, 0.0, {})
+        self._cond = asyncio.Condition()
+        self._task = None
+        self.polls = 0
+        self.skipped = 0    # payloads unchanged since the previous poll
+        self.errors = 0
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+
+    def latest(self) -> ScanFrame:
+        """Newest frame (seq 0 until the first scan arrived). Never waits."""
+        return self._frame
+
+    async def wait_newer(self, seq: int, timeout: float | None = None) -> ScanFrame | None:
+        """First frame with frame.seq > seq, or None on timeout."""
+        async with self._cond:
+            try:
+                await asyncio.wait_for(self._cond.wait_for(lambda: self._frame.seq > seq), timeout)
+            except asyncio.TimeoutError:
+                return None
+            return self._frame
+
+    # ------------------------------------------------------------------ #
+    # Polling
+    # ------------------------------------------------------------------ #
+
+    async def poll_once(self) -> bool:
+        """Read every signal once; returns True if a new frame was published."""
+        payloads = await asyncio.gather(*(self.sim.getStringSignal(sig) for sig in self.signals))
+        self.polls += 1
+        changed = False
+        for sig, b64 in zip(self.signals, payloads):
+            if isinstance(b64, str):
+                b64 = b64.encode("ascii")
+            digest = hashlib.blake2b(b64 or b"", digest_size=16).digest()
+            if self._digests.get(sig) == digest:
+                self.skipped += 1
+                continue
+            self._digests[sig] = digest
+            store_packet(sig, b64)
+            changed = True
+        if changed:
+            frame = ScanFrame(self._frame.seq + 1, time.monotonic(), {sig: latest_data[sig] for sig in self.signals})
+            async with self._cond:
+                self._frame = frame
+                self._cond.notify_all()
+        return changed
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1 or self.errors % 100 == 0:
+                    print(f"⚠️ Sensor poll failed for {self.robot} ({self.errors}x): {e}")
+            await asyncio.sleep(max(0.0, self.period - (loop.time() - t0)))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"sensor-poller-{self.robot}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+
+# ============================================================================
+# Per-robot registry
+# ============================================================================
+
+_POLLERS: dict[str, SensorPoller] = {}
+
+
+def start_pollers(sims: dict, rate_hz: float = POLL_RATE_HZ) -> None:
+    """Start one poller per robot; `sims` maps robot name -> sim object."""
+    for robot, sim in sims.items():
+        poller = _POLLERS.get(robot)
+        if poller is None:
+            poller = _POLLERS[robot] = SensorPoller(sim, robot, rate_hz)
+        poller.start()
+    print(f"📡 Sensor pollers running for {', '.join(sims)} at {rate_hz:g} Hz.")
+
+
+async def stop_pollers() -> None:
+    for poller in _POLLERS.values():
+        await poller.stop()
+    _POLLERS.clear()
+
+
+def poller_for(robot_name: str) -> SensorPoller | None:
+    """The running poller of `robot_name`, or None (callers then fetch directly)."""
+    poller = _POLLERS.get(robot_name)
+    return poller if poller is not None and poller.running else None
@@ -1,15 +1,22 @@
 """
 Global shared state for the sim.
-- Persistent occupancy/cost maps that grow as needed
+- Persistent tiled occupancy/log-odds map, with a dense planning view that
+  grows as needed
 - Latest sensor packets (already in robot-local laser_frame)
 - Robot poses/goals/status
 """
 
-from collections import defaultdict
+from collections import defaultdict, deque
 import math
 import os
+import threading
 import numpy as np
 
+from sim_app.map_journal import MapJournal
+from sim_app.map_saver import BackgroundSaver, write_npz_atomic
+from sim_app.scan_history import ScanRing
+from sim_app.tile_map import TileLayer
+
 
 # ============================================================================
 # Map configuration
@@ -20,93 +27,456 @@ GRID_SIZE = 225       # keep odd size so center is an integer cell
 MAP_SIZE_M = GRID_SIZE * MAP_RESOLUTION
 INFLATION_RADIUS_M = 0.10
 FREEZE_MAP = True     # True = use the saved map only; no live updates
+MAP_PERSIST = True    # False = live updates stay in memory (no journal, no saves)
 PATH_CLEARANCE_M = 0.25
 
+# AStarEnvironment settings shared by in-process and pool planning (and the
+# planner benchmark)
+PLANNER_SETTINGS = dict(
+    block_threshold=0.99,        # keep binary blocking strict
+    soft_cost_gain=None,         # using proximity cost instead
+    proximity_k_cells=3,         # rings to look around each neighbor (3 * 0.20 = 0.60 m)
+    proximity_cost_gain=0.5,     # tune 0.5–2.0; higher = keeps farther from walls
+)
+
+# Log-odds mapping (map_builder.update_memory_with_fleet). Hits add
+# LOGODDS_HIT, cells a ray passed through add LOGODDS_MISS, values are clamped
+# to [LOGODDS_MIN, LOGODDS_MAX]; a cell is occupied above LOGODDS_OCCUPIED.
+# False = hits only, nothing is ever cleared (original behavior).
+MAP_LOGODDS = True
+LOGODDS_HIT = 0.85
+LOGODDS_MISS = -0.4
+LOGODDS_MIN = -2.0
+LOGODDS_MAX = 3.5
+LOGODDS_OCCUPIED = 0.0
+SENSOR_MAX_RANGE_M = 8.0  # longer returns only clear free space up to this range
+
+
+# ============================================================================
+# Named locations (mirrors LLM.location_map)
+# ============================================================================
+
+LOCATION_MAP = {
+    "Meetings Table": (-1.500, -7.000),
+    "Office Table": (-2.000, 2.000),
+    "Cupboard A": (6.800, 1.000),
+    "Cupboard B": (3.800, 1.000),
+    "Cupboard C": (3.800, -3.000),
+    "Cupboard D": (6.800, -3.000),
+    "Meetings Rack": (-4.500, -4.000),
+    "Office Rack": (-4.500, 0.000),
+    "Rack A": (8.000, -5.000),
+    "Rack B": (5.000, -5.000),
+    "Rack C": (8.000, -9.000),
+    "Rack D": (5.000, -9.000),
+    "Rack 1": (3.000, -2.000),
+    "Rack 2": (3.000, -6.000),
+    "Rack 3": (3.000, -10.000),
+    "test" : (7.000, -0.700),
+}
+
 
 # ============================================================================
 # Persistent map memory (in RAM)
 # ============================================================================
 
-# 0=free, 1=hit
+# Planning view: dense copy of map_tiles["occupancy"] (0=free, 1=hit) over the
+# centered GRID_SIZE window (index GRID_SIZE // 2 is world cell 0). Only
+# write_map_cells() and the load/clear/resize exports change it.
 global_occupancy = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.uint8)
 
-# 0.0=free, 1.0=inflated
+# 0.0=free, 1.0=inflated (built from global_occupancy)
 global_costmap = np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.float32)
 
+
+def logodds_from_occupancy(occ: np.ndarray) -> np.ndarray:
+    """Log-odds layer for a saved binary map: hits start fully confident."""
+    return np.where(occ > 0, LOGODDS_MAX, 0.0).astype(np.float32)
+
+
+# The map of record: occupancy and log-odds (thresholded into occupancy) in
+# world cells with a fixed origin (see tile_map.py). Tiles exist only where
+# something was observed, and every map write goes through write_map_cells().
+map_tiles = {
+    "occupancy": TileLayer(dtype=np.uint8, fill=0),
+    "logodds": TileLayer(dtype=np.float32, fill=0.0),
+}
+
+# ensure_map_covers() grows the planning view to at least this many times its
+# size, so a robot driving outward re-exports it a logarithmic number of times
+MAP_GROWTH_FACTOR = 1.5
+
+
+def _reset_map_tiles() -> None:
+    for layer in map_tiles.values():
+        layer.tiles.clear()
+
+
+# Held while the map layers are written (mapping tick, load, resize) and while
+# map_builder.planning_snapshot() copies them, so snapshots are never torn.
+MAP_LOCK = threading.RLock()
+
+# Change tracking: map_version increases whenever global_occupancy changes;
+# map_dirty_bbox is the (y0, y1, x0, x1) box of occupancy cells changed since
+# the last rebuild_costmap (None = clean); map_change_log holds recent
+# (version, bbox) entries, bbox None meaning "whole map" (load/clear/resize).
+map_version = 0
+map_dirty_bbox = None
+map_change_log = deque(maxlen=256)
+
 # File on disk
 MAP_FILE = os.path.join(os.path.dirname(__file__), "map_memory.npz")
 
+# Write-ahead journal of occupancy changes since MAP_FILE was written
+# (see map_journal.py); compacted after every save of MAP_FILE
+MAP_JOURNAL_FILE = os.path.join(os.path.dirname(__file__), "map_memory.journal")
+MAP_JOURNAL_MAX_RECORDS = 200_000  # force a base save (and compaction) past this
+
+# Cost-to-go fields for LOCATION_MAP goals (see goal_fields.py)
+GOAL_FIELDS_FILE = os.path.join(os.path.dirname(__file__), "goal_fields.npz")
+
+
+def mark_map_dirty(bbox=None) -> int:
+    """
+    Record an occupancy change and bump map_version.
+
+    Args:
+        bbox: (y0, y1, x0, x1) half-open cell box that changed, None for
+            the whole map, or () when only cells outside the planning view
+            changed (the version still moves, for the journal).
+
+    Returns:
+        The new map_version.
+    """
+    global map_version, map_dirty_bbox
+    map_version += 1
+    if bbox is None:
+        map_dirty_bbox = (0, global_occupancy.shape[0], 0, global_occupancy.shape[1])
+        map_change_log.append((map_version, None))
+        return map_version
+    if not bbox:
+        map_change_log.append((map_version, ()))
+        return map_version
+
+    y0, y1, x0, x1 = (int(v) for v in bbox)
+    if map_dirty_bbox is not None:
+        dy0, dy1, dx0, dx1 = map_dirty_bbox
+        y0, y1, x0, x1 = min(y0, dy0), max(y1, dy1), min(x0, dx0), max(x1, dx1)
+    map_dirty_bbox = (y0, y1, x0, x1)
+    map_change_log.append((map_version, tuple(int(v) for v in bbox)))
+    return map_version
+
+
+def map_changes_since(version: int):
+    """
+    Union bbox (y0, y1, x0, x1) of occupancy changes after `version`.
+    Returns () if nothing changed, or None if the whole map must be treated as
+    changed (whole-map event, or `version` is older than the log).
+    """
+    if version >= map_version:
+        return ()
+    if not map_change_log or map_change_log[0][0] > version + 1:
+        return None
+    out = None
+    for v, bbox in map_change_log:
+        if v <= version:
+            continue
+        if bbox is None:
+            return None
+        if not bbox:
+            continue
+        if out is None:
+            out = bbox
+        else:
+            out = (min(out[0], bbox[0]), max(out[1], bbox[1]), min(out[2], bbox[2]), max(out[3], bbox[3]))
+    return () if out is None else out
+
+
+def _record_half_cells() -> int:
+    """Half size of the smallest centered window holding the planning view and every tile."""
+    half = GRID_SIZE // 2
+    for layer in map_tiles.values():
+        b = layer.bounds()
+        if b is not None:
+            half = max(half, -b[0], -b[1], b[2] - 1, b[3] - 1)
+    return half
+
+
+def map_snapshot() -> dict:
+    """
+    Point-in-time copies of the map, ready to be written to disk: the whole
+    record as centered dense layers, the costmap padded to match, and the
+    planning view's size (grid_size) to restore on load.
+    """
+    with MAP_LOCK:
+        half = _record_half_cells()
+        occupancy = map_tiles["occupancy"].dense(half)
+        costmap = np.zeros(occupancy.shape, dtype=np.float32)
+        o = half - GRID_SIZE // 2
+        costmap[o:o + global_costmap.shape[0], o:o + global_costmap.shape[1]] = global_costmap
+        return {
+            "occupancy": occupancy,
+            "costmap": costmap,
+            "logodds": map_tiles["logodds"].dense(half),
+            "grid_size": np.int64(GRID_SIZE),
+            "res": np.float32(MAP_RESOLUTION),
+            "version": np.int64(map_version),
+        }
+
+
+_MAP_JOURNAL = MapJournal(MAP_JOURNAL_FILE)
+
+
+_SNAPSHOT_LOCK = threading.Lock()
+_written_version: dict[str, int] = {}  # path -> map version last written there
+
+
+def _write_snapshot(path: str, snapshot: dict) -> None:
+    """
+    Write a snapshot atomically, never replacing a newer one (sync and
+    background saves can race); a new base MAP_FILE makes older journal
+    records redundant.
+    """
+    key = os.path.abspath(path)
+    version = int(snapshot["version"])
+    with _SNAPSHOT_LOCK:
+        if version < _written_version.get(key, -1):
+            return
+        write_npz_atomic(path, snapshot)
+        _written_version[key] = version
+        if key == os.path.abspath(MAP_FILE):
+            _MAP_JOURNAL.compact(version, window=snapshot["occupancy"].shape)
+
 
 def save_map(path: str = MAP_FILE) -> None:
-    """Persist occupancy + costmap to disk."""
-    np.savez_compressed(
-        path,
-        occupancy=global_occupancy,
-        costmap=global_costmap,
-        res=np.float32(MAP_RESOLUTION),
+    """Persist occupancy + costmap to disk (synchronous, atomic replace)."""
+    _write_snapshot(path, map_snapshot())
+
+
+# Writes snapshots on a worker thread (see map_saver.py)
+_MAP_SAVER = BackgroundSaver(_write_snapshot)
+
+
+def save_map_async(path: str = MAP_FILE) -> None:
+    """Snapshot the map now and write it in the background (bursts coalesce)."""
+    if not MAP_PERSIST:
+        return
+    _MAP_SAVER.request(path, map_snapshot())
+
+
+def flush_map_saves(timeout: float | None = None) -> bool:
+    """Wait until background map saves are on disk. Returns False on timeout."""
+    return _MAP_SAVER.flush(timeout)
+
+
+def journal_map_changes(wx, wy, old, new, logodds, version: int) -> None:
+    """
+    Append changed occupancy cells (world cells wx, wy; previous and new
+    values, log-odds after the change) to the journal under map `version`.
+    """
+    if not MAP_PERSIST:
+        return
+    _MAP_JOURNAL.append(version, wx, wy, old, new, logodds)
+    if _MAP_JOURNAL.records > MAP_JOURNAL_MAX_RECORDS:
+        save_map_async()
+
+
+def write_map_cells(wx, wy, occupancy, logodds) -> int:
+    """
+    Write occupancy and log-odds at world cells (wx, wy) to map_tiles.
+    Cells whose occupancy changed are copied into the planning view when
+    they lie inside it (marking it dirty) and journaled. The caller holds
+    MAP_LOCK. Returns the number of occupancy cells that changed.
+    """
+    wx, wy = np.asarray(wx, dtype=np.int64), np.asarray(wy, dtype=np.int64)
+    occ_layer, lo_layer = map_tiles["occupancy"], map_tiles["logodds"]
+    new = np.broadcast_to(np.asarray(occupancy, dtype=np.uint8), wx.shape)
+    lo = np.broadcast_to(np.asarray(logodds, dtype=np.float32), wx.shape)
+    old = occ_layer.get_cells(wx, wy)
+    lo_layer.set_cells(wx, wy, lo)
+    flip = old != new
+    if not flip.any():
+        return 0
+    wx, wy, old, new, lo = wx[flip], wy[flip], old[flip], new[flip], lo[flip]
+    occ_layer.set_cells(wx, wy, new)
+
+    H, W = global_occupancy.shape
+    xs, ys = wx + W // 2, wy + H // 2
+    inside = (xs >= 0) & (xs < W) & (ys >= 0) & (ys < H)
+    bbox = ()  # changes outside the view leave planning untouched
+    if inside.any():
+        xs, ys = xs[inside], ys[inside]
+        global_occupancy[ys, xs] = new[inside]
+        bbox = (ys.min(), ys.max() + 1, xs.min(), xs.max() + 1)
+    version = mark_map_dirty(bbox)
+    journal_map_changes(wx, wy, old, new, lo, version)
+    return int(flip.sum())
+
+
+def _export_view(size: int) -> None:
+    """
+    Re-export the planning view as the centered size x size window of
+    map_tiles (with an empty costmap to rebuild) and mark it all dirty.
+    The caller holds MAP_LOCK.
+    """
+    global global_occupancy, global_costmap, GRID_SIZE, MAP_SIZE_M
+    global_occupancy = map_tiles["occupancy"].dense(size // 2)
+    global_costmap = np.zeros(global_occupancy.shape, dtype=np.float32)
+    GRID_SIZE = int(global_occupancy.shape[0])
+    MAP_SIZE_M = GRID_SIZE * MAP_RESOLUTION
+    mark_map_dirty()
+
+
+def _replay_journal(base_version: int, window: tuple[int, int]) -> int:
+    """
+    Apply journal records newer than `base_version` to map_tiles, plus
+    records of cells outside `window` (H, W), the base snapshot's centered
+    extent (older snapshots held only the planning view). Returns records
+    applied.
+    """
+    global map_version
+    rec = _MAP_JOURNAL.read()
+    H, W = window
+    inside = (
+        (rec["wx"] >= -(W // 2)) & (rec["wx"] < W - W // 2)
+        & (rec["wy"] >= -(H // 2)) & (rec["wy"] < H - H // 2)
     )
+    rec = rec[~inside | (rec["version"] > base_version)]
+    if rec.size == 0:
+        map_version = max(map_version, base_version)
+        return 0
+    applied = int(rec.size)
+
+    # newest record per cell wins
+    cell = (rec["wx"].astype(np.int64) << 32) | (rec["wy"].astype(np.int64) & 0xFFFFFFFF)
+    _, first = np.unique(cell[::-1], return_index=True)
+    rec = rec[::-1][first]
+    map_tiles["occupancy"].set_cells(rec["wx"], rec["wy"], rec["new"])
+    map_tiles["logodds"].set_cells(rec["wx"], rec["wy"], rec["logodds"])
+    map_version = max(map_version, base_version, int(rec["version"].max()))
+    return applied
 
 
 def load_map(path: str = MAP_FILE) -> None:
-    """Load map from disk if present."""
-    global global_occupancy, global_costmap, GRID_SIZE, MAP_SIZE_M
-    if os.path.exists(path):
-        data = np.load(path)
-        global_occupancy = data["occupancy"].astype(np.uint8)
-        global_costmap = data["costmap"].astype(np.float32)
-        GRID_SIZE = int(global_occupancy.shape[0])
-        MAP_SIZE_M = GRID_SIZE * MAP_RESOLUTION
+    """
+    Load map from disk if present into map_tiles. For MAP_FILE, journal
+    records written after that snapshot are replayed on top. The planning
+    view is then exported at its saved size and the costmap rebuilt.
+    """
+    with MAP_LOCK:
+        base_version = 0
+        window = (0, 0)
+        view_size = GRID_SIZE
+        loaded = os.path.exists(path)
+        if loaded:
+            data = np.load(path)
+            occupancy = data["occupancy"].astype(np.uint8)
+            if "logodds" in data.files and data["logodds"].shape == occupancy.shape:
+                logodds = data["logodds"].astype(np.float32)
+            else:
+                logodds = logodds_from_occupancy(occupancy)
+            if "version" in data.files:
+                base_version = int(data["version"])
+            _reset_map_tiles()
+            map_tiles["occupancy"].write_centered(occupancy)
+            map_tiles["logodds"].write_centered(logodds)
+            window = occupancy.shape
+            view_size = int(data["grid_size"]) if "grid_size" in data.files else int(occupancy.shape[0])
+
+        replayed = 0
+        if os.path.abspath(path) == os.path.abspath(MAP_FILE):
+            replayed = _replay_journal(base_version, window)
+        if loaded or replayed:
+            _export_view(view_size)
+    if loaded or replayed:
+        from sim_app.map_builder import rebuild_costmap  # map_builder imports this module
+
+        rebuild_costmap()
+    if replayed:
+        print(f"✅ replayed {replayed} map journal records")
 
 
 def clear_map() -> None:
-    """Reset in-RAM map (does not delete the .npz file)."""
-    global global_occupancy, global_costmap
-    global_occupancy[:] = 0
-    global_costmap[:] = 0.0
+    """
+    Reset in-RAM map (does not delete the .npz file). The journal is emptied
+    too, so its old changes are not replayed once the cleared map is saved.
+    """
+    with MAP_LOCK:
+        _reset_map_tiles()
+        global_occupancy[:] = 0
+        global_costmap[:] = 0.0
+        _MAP_JOURNAL.compact(mark_map_dirty())
 
 
 # Autosave helper (call occasionally)
 def maybe_autosave(every_n_updates: int = 50) -> None:
-    """Autosave the map every `every_n_updates` calls."""
+    """Autosave the map (in the background) every `every_n_updates` calls."""
     global _save_counter
     try:
         _save_counter += 1
     except NameError:
         _save_counter = 1
     if _save_counter % every_n_updates == 0:
-        save_map()
+        save_map_async()
 
 
 def ensure_map_covers(xs, ys, margin_m: float = 1.0) -> None:
     """
-    Grow global_occupancy/global_costmap symmetrically if any (x,y) lies
-    outside the current map (plus a margin).
-    """
-    global global_occupancy, global_costmap, GRID_SIZE, MAP_SIZE_M
+    Grow the planning view (global_occupancy/global_costmap) symmetrically
+    if any (x,y) lies outside it (plus a margin), by at least
+    MAP_GROWTH_FACTOR.
 
+    The view is exported again from map_tiles, which already holds every
+    cell, so nothing is moved or copied out of the old view; world cell
+    (0, 0) stays the center cell.
+    """
     half_w = (GRID_SIZE // 2) * MAP_RESOLUTION
     need = max(max(abs(x) for x in xs), max(abs(y) for y in ys)) + margin_m
     if need <= half_w:
         return
 
-    new_half_cells = math.ceil(need / MAP_RESOLUTION)
+    old_half = GRID_SIZE // 2
+    new_half_cells = max(math.ceil(need / MAP_RESOLUTION), math.ceil(old_half * MAP_GROWTH_FACTOR))
     new_size = int(new_half_cells * 2 + 1)
-    pad = (new_size - GRID_SIZE) // 2
-    if pad <= 0:
+    if new_size <= GRID_SIZE:
         return
 
-    global_occupancy = np.pad(global_occupancy, ((pad, pad), (pad, pad)), mode="constant")
-    global_costmap = np.pad(global_costmap, ((pad, pad), (pad, pad)), mode="constant")
-    GRID_SIZE = new_size
-    MAP_SIZE_M = GRID_SIZE * MAP_RESOLUTION
+    with MAP_LOCK:
+        _export_view(new_size)
 
 
 # ============================================================================
 # Dynamic runtime state
 # ============================================================================
 
+# Scan history per signal (see scan_history.py): bounded by points, scans and
+# age; set SENSOR_HISTORY_SPILL_DIR to keep evicted scans in <signal>.f32 files
+SENSOR_HISTORY_POINTS = 200_000   # ~3.2 MB per signal
+SENSOR_HISTORY_SCANS = 512
+SENSOR_HISTORY_WINDOW_S = 60.0
+SENSOR_HISTORY_SPILL_DIR = None
+
+# Record every decoded scan plus robot poses, one frame per main-loop tick, to
+# <SENSOR_LOG_PATH>.* for offline replay (see sensor_log.py); None = off
+SENSOR_LOG_PATH = None
+
+
+class _ScanHistory(dict):
+    """signal -> ScanRing, created with the SENSOR_HISTORY_* settings on first use."""
+
+    def __missing__(self, signal):
+        spill = None
+        if SENSOR_HISTORY_SPILL_DIR:
+            os.makedirs(SENSOR_HISTORY_SPILL_DIR, exist_ok=True)
+            spill = os.path.join(SENSOR_HISTORY_SPILL_DIR, f"{signal}.f32")
+        ring = self[signal] = ScanRing(
+            SENSOR_HISTORY_POINTS, SENSOR_HISTORY_SCANS, SENSOR_HISTORY_WINDOW_S, spill
+        )
+        return ring
+
+
 latest_data = defaultdict(list)
-all_sensor_data = defaultdict(list)
+all_sensor_data = _ScanHistory()
 
 latest_astar_path: list = []
 latest_astar_path_by_robot = defaultdict(list)
@@ -0,0 +1,163 @@
+# sim_app/tile_map.py
+"""
+Sparse tiled map storage.
+
+- Cells are addressed by signed world cell coordinates with a fixed origin:
+  world cell (0, 0) holds world point (0, 0), the same cell a centered odd
+  dense grid keeps at its center index. Growing the map therefore never moves
+  a cell.
+- TileLayer: one map layer (occupancy, log-odds, costmap...) split into
+  tile_size x tile_size chunks in a dict keyed by tile coordinates. Tiles are
+  only allocated when written with non-fill content, so unexplored space
+  costs no memory.
+- read() / dense(): dense window exports (dense() is centered like
+  shared.global_occupancy, so meters_to_grid works on it unchanged).
+- shared.map_tiles keeps the occupancy and log-odds layers this way as the map
+  of record; shared.global_occupancy is a dense export of a window of it.
+- reference_cell: grid indices in the original 225 x 225 map frame, used by
+  lookups against exported cell lists (free_grids.txt, occupied_grids.txt).
+"""
+
+import numpy as np
+
+
+REFERENCE_GRID_SIZE = 225  # frame of free_grids.txt / occupied_grids.txt
+
+
+def reference_cell(x: float, y: float, res: float) -> tuple[int, int]:
+    """meters_to_grid() on a REFERENCE_GRID_SIZE grid, whatever the live map size is."""
+    half = REFERENCE_GRID_SIZE // 2
+    return int(half + x / res), int(half + y / res)
+
+
+class TileLayer:
+    """
+    Args:
+        tile_size: cells per tile side.
+        dtype: cell dtype.
+        fill: value of cells in unallocated tiles.
+    """
+
+    def __init__(self, tile_size: int = 64, dtype=np.uint8, fill=0):
+        self.T = int(tile_size)
+        self.dtype = np.dtype(dtype)
+        self.fill = self.dtype.type(fill)
+        self.tiles: dict[tuple[int, int], np.ndarray] = {}  # (tx, ty) -> (T, T) [y, x]
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes for t in self.tiles.values())
+
+    def _new_tile(self) -> np.ndarray:
+        return np.full((self.T, self.T), self.fill, dtype=self.dtype)
+
+    def bounds(self) -> tuple[int, int, int, int] | None:
+        """(x0, y0, x1, y1) half-open world-cell box of the allocated tiles, or None."""
+        if not self.tiles:
+            return None
+        txs = [k[0] for k in self.tiles]
+        tys = [k[1] for k in self.tiles]
+        T = self.T
+        return min(txs) * T, min(tys) * T, (max(txs) + 1) * T, (max(tys) + 1) * T
+
+    # ------------------------------------------------------------------ #
+    # Cell access
+    # ------------------------------------------------------------------ #
+
+    def _by_tile(self, cx: np.ndarray, cy: np.ndarray):
+        """Yield ((tx, ty), indices of the cells in that tile), one sort for the batch."""
+        if cx.size == 0:
+            return
+        tx, ty = cx // self.T, cy // self.T
+        order = np.argsort((tx << 32) | (ty & 0xFFFFFFFF), kind="stable")
+        stx, sty = tx[order], ty[order]
+        starts = np.flatnonzero(np.r_[True, (stx[1:] != stx[:-1]) | (sty[1:] != sty[:-1])])
+        for s, e in zip(starts.tolist(), np.r_[starts[1:], order.size].tolist()):
+            yield (int(stx[s]), int(sty[s])), order[s:e]
+
+    def get_cells(self, cx, cy) -> np.ndarray:
+        """Values at world cells (cx[i], cy[i]) (fill where nothing is stored)."""
+        cx, cy = np.asarray(cx, dtype=np.int64), np.asarray(cy, dtype=np.int64)
+        out = np.full(cx.shape, self.fill, dtype=self.dtype)
+        for key, sel in self._by_tile(cx, cy):
+            tile = self.tiles.get(key)
+            if tile is None:
+                continue
+            out[sel] = tile[cy[sel] - key[1] * self.T, cx[sel] - key[0] * self.T]
+        return out
+
+    def set_cells(self, cx, cy, values) -> None:
+        """Write values at world cells (cx[i], cy[i]), allocating tiles as needed."""
+        cx, cy = np.asarray(cx, dtype=np.int64), np.asarray(cy, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(values, dtype=self.dtype), cx.shape)
+        for key, sel in self._by_tile(cx, cy):
+            tile = self.tiles.get(key)
+            if tile is None:
+                tile = self.tiles[key] = self._new_tile()
+            tile[cy[sel] - key[1] * self.T, cx[sel] - key[0] * self.T] = values[sel]
+
+    # ------------------------------------------------------------------ #
+    # Dense windows
+    # ------------------------------------------------------------------ #
+
+    def _tile_range(self, x0: int, y0: int, w: int, h: int):
+        T = self.T
+        for ty in range(y0 // T, (y0 + h - 1) // T + 1):
+            for tx in range(x0 // T, (x0 + w - 1) // T + 1):
+                # overlap of tile (tx, ty) with the window, in world cells
+                ax0, ay0 = max(x0, tx * T), max(y0, ty * T)
+                ax1, ay1 = min(x0 + w, (tx + 1) * T), min(y0 + h, (ty + 1) * T)
+                yield (tx, ty), (ax0, ay0, ax1, ay1)
+
+    def read(self, x0: int, y0: int, w: int, h: int) -> np.ndarray:
+        """Dense (h, w) copy of the window whose [0, 0] is world cell (x0, y0)."""
+        out = np.full((h, w), self.fill, dtype=self.dtype)
+        if w <= 0 or h <= 0:
+            return out
+        T = self.T
+        for key, (ax0, ay0, ax1, ay1) in self._tile_range(x0, y0, w, h):
+            tile = self.tiles.get(key)
+            if tile is None:
+                continue
+            out[ay0 - y0:ay1 - y0, ax0 - x0:ax1 - x0] = tile[
+                ay0 - key[1] * T:ay1 - key[1] * T, ax0 - key[0] * T:ax1 - key[0] * T
+            ]
+        return out
+
+    def write(self, x0: int, y0: int, arr: np.ndarray) -> None:
+        """
+        Store a dense window whose [0, 0] is world cell (x0, y0). Tiles that
+        would only contain fill are dropped instead of allocated.
+        """
+        h, w = arr.shape
+        if w <= 0 or h <= 0:
+            return
+        T = self.T
+        for key, (ax0, ay0, ax1, ay1) in self._tile_range(x0, y0, w, h):
+            part = arr[ay0 - y0:ay1 - y0, ax0 - x0:ax1 - x0]
+            tile = self.tiles.get(key)
+            if tile is None:
+                if not (part != self.fill).any():
+                    continue
+                tile = self.tiles[key] = self._new_tile()
+            tile[ay0 - key[1] * T:ay1 - key[1] * T, ax0 - key[0] * T:ax1 - key[0] * T] = part
+            if not (tile != self.fill).any():
+                del self.tiles[key]
+
+    def write_centered(self, arr: np.ndarray) -> None:
+        """Store a centered dense grid (index W // 2 is world cell 0)."""
+        self.write(-(arr.shape[1] // 2), -(arr.shape[0] // 2), arr)
+
+    def dense(self, half_cells: int | None = None) -> np.ndarray:
+        """
+        Centered (2h+1) x (2h+1) export, index h = world cell 0, like
+        shared.global_occupancy. Default h: just enough to cover every tile.
+        """
+        if half_cells is None:
+            b = self.bounds()
+            half_cells = 0 if b is None else max(-b[0], -b[1], b[2] - 1, b[3] - 1)
+        n = 2 * int(half_cells) + 1
+        return self.read(-half_cells, -half_cells, n, n)